@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from apps.core.images import ImageSrcsetField
 from .models import User, UserAddress, UserPaymentMethod, OTPToken
 import re
 
@@ -72,9 +73,11 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('Must include identifier and password.')
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_srcset = ImageSrcsetField(source='avatar')
+
     class Meta:
         model = User
-        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'avatar', 
+        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'avatar', 'avatar_srcset',
                  'is_verified', 'date_joined', 'last_login']
         read_only_fields = ['id', 'date_joined', 'last_login']
 
@@ -0,0 +1,4 @@
+from apps.core.images import register_derivatives
+from .models import User
+
+register_derivatives(User, 'avatar')
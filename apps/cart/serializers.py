@@ -41,7 +41,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         return "/placeholder.svg"
 
     def get_inStock(self, obj):
-        return obj.product.stock_quantity > 0
+        return obj.product.stats.is_in_stock
 
 
 
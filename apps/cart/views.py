@@ -18,7 +18,7 @@ class CartView(APIView):
         if created:
             print(f"[DEBUG] Created new cart for user {request.user}")
         # ✅ Only fetch non-deleted items
-        items = CartItem.objects.filter(cart=cart, is_removed=False)
+        items = CartItem.objects.filter(cart=cart, is_removed=False).select_related('product__stats')
         print(f"[DEBUG] Cart {cart.id} has {items.count()} items")
         serializer = CartItemSerializer(items, many=True)
         print(f"[DEBUG] Serialized cart items: {serializer.data}")
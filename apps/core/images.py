@@ -0,0 +1,170 @@
+import io
+import logging
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# (model, field name) pairs passed to register_derivatives, walked by backfill_image_derivatives
+REGISTERED_FIELDS = []
+
+# File extension and Pillow save options per derivative format. WebP method 2
+# encodes ~3x faster than the default 4 for files ~5% larger; the JPEG
+# fallback skips optimize/progressive, which cost ~5x the encode time
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'method': 2}),
+    'jpeg': ('jpg', {'format': 'JPEG'}),
+}
+
+
+def derivative_sizes():
+    """Configured (name, width) pairs, largest first."""
+    return sorted(settings.IMAGE_DERIVATIVE_SIZES.items(), key=lambda item: -item[1])
+
+
+def derivative_name(name, size, image_format):
+    """
+    ``products/shoe.png`` -> ``products/shoe.png__card.webp``: derivatives sit
+    next to the original and keep its extension, so shoe.png and shoe.jpg
+    never share derivatives.
+    """
+    return f'{name}__{size}.{FORMATS[image_format][0]}'
+
+
+def _flatten(image, image_format):
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha channel: composite transparent images onto white
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    if image.mode not in ('RGB', 'RGBA'):
+        return image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    return image
+
+
+def generate_derivatives(name, storage=None, overwrite=False):
+    """
+    Write every configured size and format of the image stored at ``name``.
+    Existing derivatives are kept unless ``overwrite`` is set; uploaded files
+    never reuse a name and derivative names embed the full original name, so
+    an existing derivative always matches its original.
+    Returns the number of files written.
+    """
+    storage = storage or default_storage
+    targets = [
+        (size, width, image_format, derivative_name(name, size, image_format))
+        for size, width in derivative_sizes() for image_format in settings.IMAGE_DERIVATIVE_FORMATS
+    ]
+    if not overwrite:
+        targets = [target for target in targets if not storage.exists(target[3])]
+    if not targets:
+        return 0
+
+    with storage.open(name, 'rb') as handle:
+        image = Image.open(handle)
+        largest = max(width for _, width, _, _ in targets)
+        # JPEG sources decode straight at a reduced scale when far larger than
+        # needed; square bounds keep enough pixels whatever the EXIF rotation
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    written = 0
+    # Each size is resampled from the previous, larger one instead of the full original
+    source = image
+    for size, width, image_format, target in sorted(targets, key=lambda target: -target[1]):
+        if source.width > width:
+            source = source.resize((width, max(1, round(source.height * width / source.width))), Image.LANCZOS)
+        buffer = io.BytesIO()
+        _, options = FORMATS[image_format]
+        _flatten(source, image_format).save(buffer, quality=settings.IMAGE_DERIVATIVE_QUALITY, **options)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(buffer.getvalue()))
+        written += 1
+    return written
+
+
+def derivative_urls(url):
+    """
+    Map of size -> {format: url} for an original image URL. Built by string
+    rewriting, so serializers pay for one storage.url() per image, not one
+    per derivative.
+    """
+    return {
+        size: {
+            image_format: f'{url}__{size}.{FORMATS[image_format][0]}'
+            for image_format in settings.IMAGE_DERIVATIVE_FORMATS
+        }
+        for size, _ in derivative_sizes()
+    }
+
+
+def srcset(url):
+    """
+    ``{'webp': 'a.png__thumbnail.webp 160w, ...', 'jpeg': ..., 'by_size': {...}}``
+    for an original image URL, or None without an image.
+    """
+    if not url:
+        return None
+    urls = derivative_urls(url)
+    widths = dict(derivative_sizes())
+    data = {
+        image_format: ', '.join(
+            f'{urls[size][image_format]} {widths[size]}w' for size in sorted(widths, key=widths.get)
+        )
+        for image_format in settings.IMAGE_DERIVATIVE_FORMATS
+    }
+    data['by_size'] = urls
+    return data
+
+
+class ImageSrcsetField(serializers.ImageField):
+    """Read-only srcset() map of an image field's derivatives."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return srcset(super().to_representation(value))
+
+
+def _generate_after_commit(name):
+    def generate():
+        try:
+            generate_derivatives(name)
+        except Exception:
+            # The original stays usable; backfill_image_derivatives retries later
+            logger.exception('Could not generate derivatives for %s', name)
+    transaction.on_commit(generate)
+
+
+def register_derivatives(model, field_name):
+    """Generate derivatives whenever a new file is uploaded to ``model.<field_name>``."""
+
+    def remember_upload(sender, instance, raw=False, **kwargs):
+        file = getattr(instance, field_name)
+        # Freshly assigned uploads are committed to storage by the field's pre_save
+        instance._pending_uploads = getattr(instance, '_pending_uploads', set())
+        if not raw and file and not file._committed:
+            instance._pending_uploads.add(field_name)
+
+    def generate_for_upload(sender, instance, **kwargs):
+        pending = getattr(instance, '_pending_uploads', set())
+        if field_name in pending and settings.IMAGE_DERIVATIVES_ON_UPLOAD:
+            pending.discard(field_name)
+            _generate_after_commit(getattr(instance, field_name).name)
+
+    REGISTERED_FIELDS.append((model, field_name))
+    uid = f'image_derivatives:{model._meta.label}.{field_name}'
+    pre_save.connect(remember_upload, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(generate_for_upload, sender=model, weak=False, dispatch_uid=uid)
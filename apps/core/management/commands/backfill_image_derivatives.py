@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+from apps.core.images import REGISTERED_FIELDS, generate_derivatives
+
+# Files handed to a worker per task
+TASK_SIZE = 20
+
+
+def _setup_worker():
+    # Spawned workers (macOS, Windows) start without a configured Django
+    if not apps.ready:
+        django.setup()
+
+
+def _process(names, overwrite):
+    written, failed = 0, []
+    for name in names:
+        try:
+            written += generate_derivatives(name, overwrite=overwrite)
+        except Exception as exc:
+            failed.append(f'{name}: {exc}')
+    return len(names), written, failed
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnail/card/zoom derivatives for every stored product, category and avatar image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes resizing images in parallel')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Regenerate derivatives that already exist, e.g. after changing sizes or quality')
+
+    def handle(self, *args, **options):
+        names = []
+        for model, field_name in REGISTERED_FIELDS:
+            names.extend(
+                model._default_manager.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+                .order_by().values_list(field_name, flat=True).distinct()
+            )
+        names = sorted(set(names))
+        if not names:
+            self.stdout.write(self.style.WARNING('⚠️  No stored images found'))
+            return
+
+        # Workers only touch storage; forked children must not share the parent's connections
+        connections.close_all()
+        tasks = [names[start:start + TASK_SIZE] for start in range(0, len(names), TASK_SIZE)]
+        started = time.perf_counter()
+        processed = written = 0
+        failures = []
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1), initializer=_setup_worker) as executor:
+            for count, task_written, task_failed in executor.map(_process, tasks, [options['overwrite']] * len(tasks)):
+                processed += count
+                written += task_written
+                failures.extend(task_failed)
+                self.stdout.write(f'  {processed:>8,}/{len(names):,} images', ending='\r')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('')
+        for failure in failures[:10]:
+            self.stdout.write(self.style.WARNING(f'⚠️  {failure}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Wrote {written} derivatives for {len(names)} images in {elapsed:.1f}s '
+            f'({len(names) / max(elapsed, 1e-9):,.1f} images/s, {len(failures)} failed)'
+        ))
@@ -0,0 +1,106 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from apps.core.renderers import ORJSONRenderer, stream_json_array
+
+SIZES = (20, 200, 2000, 20000)
+STREAM_ROWS = 50_000
+STREAM_CHUNK = 2000
+
+
+def product_rows(count, seed=3):
+    """Payloads shaped like ProductListSerializer output, with a nested review each."""
+    rng = random.Random(seed)
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        price = rng.randint(5, 5000)
+        original_price = rng.choice([None, price + rng.randint(1, 900)])
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'name': f'Wireless headphones model {i}',
+            'price': price,
+            'original_price': original_price,
+            'category_name': rng.choice(['Audio', 'Wearables', 'Home', 'Outdoor']),
+            'image': f'https://cdn.example.com/media/products/{i}.webp',
+            'rating': rng.randint(0, 5),
+            'reviewCount': rng.randint(0, 4000),
+            'discount_percentage': int((original_price - price) / original_price * 100) if original_price else 0,
+            'is_in_stock': rng.random() < 0.8,
+            'is_featured': rng.random() < 0.1,
+            'is_wishlisted': False,
+            'isOnSale': bool(original_price),
+            # Raw UUID and datetime values, which orjson encodes without a fallback
+            'latest_review': {
+                'id': uuid.UUID(int=rng.getrandbits(128)),
+                'rating': rng.randint(1, 5),
+                'created_at': created + timedelta(seconds=rng.randint(0, 10**7)),
+            },
+        }
+
+
+class Command(BaseCommand):
+    help = 'Compare the stdlib and orjson renderers, and streaming against materialized list responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=7, help='Runs per size and renderer')
+
+    def handle(self, *args, **options):
+        renderers = {'drf json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+
+        sample = list(product_rows(50))
+        decoded = {name: json.loads(renderer.render(sample)) for name, renderer in renderers.items()}
+        if decoded['drf json'] != decoded['orjson']:
+            raise CommandError('ORJSONRenderer output differs from JSONRenderer')
+        self.stdout.write(self.style.SUCCESS('✅ Both renderers decode to the same payload'))
+
+        self.stdout.write(f"{'rows':>7}" + ''.join(f'{name + " ms":>14}' for name in renderers) + f"{'speedup':>9}")
+        for size in SIZES:
+            payload = list(product_rows(size))
+            timings = {name: self.measure(options['repeat'], renderer, payload) for name, renderer in renderers.items()}
+            self.stdout.write(
+                f'{size:>7}' + ''.join(f'{timings[name]:>14.2f}' for name in renderers)
+                + f"{timings['drf json'] / timings['orjson']:>8.1f}x"
+            )
+
+        self.stdout.write(f'\nPeak memory for a {STREAM_ROWS:,}-row list response')
+        materialized_peak, materialized_size = self.peak(lambda: ORJSONRenderer().render(list(product_rows(STREAM_ROWS))))
+        streamed_peak, streamed_size = self.peak(lambda: sum(
+            len(part) for part in stream_json_array(self.chunks(product_rows(STREAM_ROWS)))
+        ))
+        if materialized_size != streamed_size:
+            raise CommandError('Streamed and materialized bodies differ in size')
+        self.stdout.write(f'  materialized: {materialized_peak / 2**20:8.1f} MiB')
+        self.stdout.write(f'  streamed:     {streamed_peak / 2**20:8.1f} MiB  ({STREAM_CHUNK} rows per chunk)')
+
+    def measure(self, repeat, renderer, payload):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            renderer.render(payload)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def chunks(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == STREAM_CHUNK:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def peak(self, build):
+        """Peak traced allocation while building (and, for streams, consuming) a response body."""
+        tracemalloc.start()
+        try:
+            result = build()
+            return tracemalloc.get_traced_memory()[1], result if isinstance(result, int) else len(result)
+        finally:
+            tracemalloc.stop()
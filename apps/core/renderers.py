@@ -0,0 +1,63 @@
+import orjson
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# UUID, datetime, date and time are encoded natively by orjson; anything else
+# (lazy translations, raw Decimals, querysets...) goes through DRF's encoder
+_fallback = JSONEncoder().default
+
+# Non-string dict keys are stringified like the stdlib encoder does
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data, indent=False):
+    option = ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else ORJSON_OPTIONS
+    return orjson.dumps(data, default=_fallback, option=option)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in replacement for DRF's JSONRenderer that encodes with orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        return dumps(data, indent=bool(indent))
+
+
+def stream_json_array(chunks):
+    """
+    Encode an iterable of item lists as one JSON array, yielding a chunk of
+    bytes per list, so only one chunk is ever held in memory.
+    """
+    yield b'['
+    separator = b''
+    for items in chunks:
+        if not items:
+            continue
+        yield separator + dumps(list(items))[1:-1]
+        separator = b','
+    yield b']'
+
+
+def streaming_list_response(queryset, serialize_chunk, chunk_size=None):
+    """
+    Stream ``queryset`` as a JSON array. Rows are read with iterator(), handed
+    to ``serialize_chunk`` ``chunk_size`` at a time and written as they are
+    encoded, so peak memory follows the chunk size instead of the row count.
+    """
+    chunk_size = chunk_size or settings.STREAMING_CHUNK_SIZE
+
+    def chunks():
+        batch = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield serialize_chunk(batch)
+                batch = []
+        if batch:
+            yield serialize_chunk(batch)
+
+    return StreamingHttpResponse(stream_json_array(chunks()), content_type='application/json')
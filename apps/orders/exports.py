@@ -0,0 +1,31 @@
+from apps.core.exports import export_iterator, grouped_rows
+from .models import Order
+
+ORDER_EXPORT_COLUMNS = [
+    'id', 'order_number', 'user_email', 'status', 'payment_status',
+    'subtotal', 'tax_amount', 'shipping_amount', 'discount_amount', 'total_amount',
+    'payment_method', 'payment_reference', 'tracking_number',
+    'shipping_name', 'shipping_phone', 'shipping_address', 'billing_name', 'billing_phone', 'billing_address',
+    'created_at', 'updated_at', 'shipped_at', 'delivered_at', 'items',
+]
+ITEM_EXPORT_FIELDS = {
+    f'items__{field}': field
+    for field in ('product_id', 'product_name', 'product_price', 'quantity', 'subtotal')
+}
+
+
+def order_export_rows(queryset=None, chunk_size=None):
+    """
+    One dict per order, oldest first, with its items, read as a single LEFT
+    JOIN off a server-side cursor so any number of orders streams in
+    constant memory.
+    """
+    queryset = Order.objects.all() if queryset is None else queryset
+    columns = [column for column in ORDER_EXPORT_COLUMNS if column not in ('user_email', 'items')]
+    rows = (
+        queryset.order_by('created_at', 'pk', 'items__id')
+        .values(*columns, 'user__email', *ITEM_EXPORT_FIELDS)
+    )
+    for order in grouped_rows(export_iterator(rows, chunk_size), 'id', ITEM_EXPORT_FIELDS, 'items'):
+        order['user_email'] = order.pop('user__email')
+        yield order
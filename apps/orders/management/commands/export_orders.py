@@ -0,0 +1,29 @@
+from apps.core.exports import ExportCommand
+from apps.orders.exports import ORDER_EXPORT_COLUMNS, order_export_rows
+from apps.orders.filters import OrderFilter
+
+
+class Command(ExportCommand):
+    help = 'Stream orders with their items to CSV or JSONL in constant memory'
+    filterset_class = OrderFilter
+    columns = ORDER_EXPORT_COLUMNS
+    name = 'orders'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--status')
+        parser.add_argument('--payment-status')
+        parser.add_argument('--created-after', help='ISO date or datetime, inclusive')
+        parser.add_argument('--created-before', help='ISO date or datetime, inclusive')
+        parser.add_argument('--total-min')
+        parser.add_argument('--total-max')
+
+    def filter_data(self, options):
+        return {
+            field: options[field]
+            for field in ('status', 'payment_status', 'created_after', 'created_before', 'total_min', 'total_max')
+            if options[field] is not None
+        }
+
+    def rows(self, queryset, chunk_size):
+        return order_export_rows(queryset, chunk_size)
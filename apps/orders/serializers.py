@@ -61,4 +61,7 @@ class SimpleOrderListSerializer(serializers.ModelSerializer):
         return obj.created_at.strftime('%Y-%m-%d')
 
     def get_items(self, obj):
+        # Annotated by MyOrdersListView
+        if hasattr(obj, 'item_count'):
+            return obj.item_count
         return obj.items.count()
\ No newline at end of file
@@ -4,5 +4,6 @@ from .views import *
 
 urlpatterns = [
     path('createOrder/', CreateOrderView.as_view(), name='cart'),
-    path('fetchOrders/', MyOrdersListView.as_view(), name='my-orders')
+    path('fetchOrders/', MyOrdersListView.as_view(), name='my-orders'),
+    path('export/', OrderExportView.as_view(), name='order-export'),
 ]
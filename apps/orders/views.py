@@ -1,7 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.db.models import Count
+from django.utils import timezone
+from django_filters.utils import translate_validation
+from apps.core.exports import export_options, export_response
+from apps.core.renderers import streaming_list_response
+from .exports import ORDER_EXPORT_COLUMNS, order_export_rows
+from .filters import OrderFilter
 from .serializers import OrderCreateRawSerializer,SimpleOrderListSerializer
 from .models import Order
 
@@ -21,6 +28,27 @@ class MyOrdersListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')
-        serializer = SimpleOrderListSerializer(orders, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        orders = (
+            Order.objects.filter(user=request.user)
+            .annotate(item_count=Count('items'))
+            .order_by('-created_at')
+        )
+        # Order history is unpaginated, so it is streamed chunk by chunk
+        return streaming_list_response(
+            orders, lambda chunk: SimpleOrderListSerializer(chunk, many=True).data
+        )
+
+
+class OrderExportView(APIView):
+    """Staff download of orders and their items, filtered like OrderFilter, as CSV or JSONL"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        file_format, compress = export_options(request.query_params)
+        filterset = OrderFilter(request.query_params, queryset=Order.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return export_response(
+            order_export_rows(filterset.qs), ORDER_EXPORT_COLUMNS, file_format,
+            f'orders-{timezone.now():%Y%m%d-%H%M%S}', compress,
+        )
@@ -1,10 +1,11 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage, ProductVariant, ProductReview, Wishlist
+from .models import Category, Product, ProductImage, ProductStats, ProductVariant, ProductReview, Wishlist
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'is_active', 'created_at']
+    list_display = ['name', 'parent', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
+    list_select_related = ['parent']
     search_fields = ['name']
 
 class ProductImageInline(admin.TabularInline):
@@ -15,13 +16,27 @@ class ProductVariantInline(admin.TabularInline):
     model = ProductVariant
     extra = 1
 
+class ProductStatsInline(admin.StackedInline):
+    model = ProductStats
+    can_delete = False
+    fields = ['stock_quantity', 'variant_stock', 'rating', 'review_count']
+    readonly_fields = ['variant_stock', 'rating', 'review_count']
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price', 'stock_quantity', 'rating', 'is_featured', 'is_active', 'created_at']
     list_filter = ['category', 'is_featured', 'is_active', 'created_at']
+    list_select_related = ['category', 'stats']
     search_fields = ['name', 'description', 'sku']
-    inlines = [ProductImageInline, ProductVariantInline]
-    readonly_fields = ['rating', 'review_count']
+    inlines = [ProductStatsInline, ProductImageInline, ProductVariantInline]
+
+    @admin.display(ordering='stats__stock_quantity')
+    def stock_quantity(self, obj):
+        return obj.stats.stock_quantity
+
+    @admin.display(ordering='stats__rating')
+    def rating(self, obj):
+        return obj.stats.rating
 
 @admin.register(ProductReview)
 class ProductReviewAdmin(admin.ModelAdmin):
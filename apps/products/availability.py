@@ -0,0 +1,85 @@
+from django.db.models import F, FilteredRelation, Min, Q, Sum
+from .models import ProductVariant
+
+# Matrix axes in this order; each product only gets the axes its active variants use
+DIMENSIONS = [choice for choice, _ in ProductVariant.VARIANT_TYPES]
+
+
+def availability_rows(queryset):
+    """
+    One grouped row per (product, variant type, value) over the active
+    variants of ``queryset``, left joined so a product without active
+    variants still comes back once, with empty variant columns.
+    """
+    return (
+        queryset.order_by()
+        .annotate(active_variant=FilteredRelation('variants', condition=Q(variants__is_active=True)))
+        .values(
+            'pk', 'sku', 'price', stock_quantity=F('stats__stock_quantity'), variant_stock=F('stats__variant_stock'),
+            variant_type=F('active_variant__type'), variant_value=F('active_variant__value'),
+        )
+        .annotate(
+            variant_name=Min('active_variant__name'),
+            stock=Sum('active_variant__stock_quantity'),
+            adjustment=Min('active_variant__price_adjustment'),
+            position=Min('active_variant__id'),
+        )
+    )
+
+
+def _cells(price, axes, chosen=()):
+    # A combination can sell no more than its scarcest option, at the base price plus every adjustment
+    if len(chosen) == len(axes):
+        stock = min(option['stock'] for option in chosen)
+        return [stock, float(price + sum(option['adjustment'] for option in chosen))]
+    return [_cells(price, axes, (*chosen, option)) for option in axes[len(chosen)]]
+
+
+def availability_matrices(queryset):
+    """
+    Availability of every product in ``queryset``, keyed by product id.
+
+    Variants are stored per dimension, not per combination, so each matrix
+    cell is derived: its stock is the smallest stock among the chosen options
+    and its price the product price plus their adjustments. ``matrix`` nests
+    one list level per entry of ``dimensions`` and ends in [stock, price]
+    pairs; a product without active variants has no dimensions and a single
+    [stock, price] cell from the product row itself.
+    """
+    products = {}
+    for row in availability_rows(queryset):
+        product = products.setdefault(row['pk'], {
+            'row': row, 'options': {dimension: [] for dimension in DIMENSIONS},
+        })
+        if row['variant_type'] is not None:
+            product['options'][row['variant_type']].append(row)
+
+    matrices = {}
+    for product_id, product in products.items():
+        row = product['row']
+        price = row['price']
+        axes = {
+            dimension: sorted(options, key=lambda option: option['position'])
+            for dimension, options in product['options'].items() if options
+        }
+        matrices[product_id] = {
+            'id': str(product_id),
+            'sku': row['sku'],
+            'price': float(price),
+            'in_stock': row['stock_quantity'] > 0 or row['variant_stock'] > 0,
+            'dimensions': list(axes),
+            'options': {
+                dimension: [
+                    {
+                        'value': option['variant_value'],
+                        'name': option['variant_name'],
+                        'stock': option['stock'],
+                        'price': float(price + option['adjustment']),
+                    }
+                    for option in axis
+                ]
+                for dimension, axis in axes.items()
+            },
+            'matrix': _cells(price, list(axes.values())) if axes else [row['stock_quantity'], float(price)],
+        }
+    return matrices
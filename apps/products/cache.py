@@ -0,0 +1,56 @@
+import time
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'products:catalog-version'
+
+
+def get_catalog_version():
+    """
+    Current catalog version. Cache keys that embed it go stale as soon as any
+    catalog row changes, without having to delete them one by one.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+
+
+def _tag_key(tag):
+    return f'products:tag:{tag}'
+
+
+def get_tag_versions(tags):
+    """
+    Current version of each cache tag. Cached responses record the versions of
+    the tags they depend on and are only served while all of them still match.
+    """
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, int(time.time() * 1000), None)
+        found[key] = cache.get(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump_tag(tag):
+    """Move one tag to a new version and return it, or None when it was unset."""
+    try:
+        return cache.incr(_tag_key(tag))
+    except ValueError:
+        # Never seeded or evicted: the next reader seeds a fresh version,
+        # which nothing recorded
+        return None
+
+
+def invalidate_tags(tags):
+    for tag in tags:
+        bump_tag(tag)
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from apps.core.images import srcset
+from .cache import get_tag_versions
+from .models import Category
+
+CATEGORY_TREE_KEY = 'products:category-tree:{}'
+
+
+def build_category_tree():
+    """
+    Active categories as nested dicts (roots first, siblings by name) from one
+    query. A category under an inactive parent is hidden along with it.
+    ``product_count`` is the category's own active products and
+    ``subtree_product_count`` includes every category below it.
+    """
+    rows = Category.objects.filter(is_active=True).values(
+        'id', 'name', 'description', 'image', 'parent_id', 'path', 'active_product_count',
+    )
+    nodes, roots = {}, []
+    # Path segments have a fixed width, so shorter paths are shallower: parents come first
+    for row in sorted(rows, key=lambda row: (len(row['path']), row['name'].lower())):
+        node = {
+            'id': str(row['id']),
+            'name': row['name'],
+            'description': row['description'],
+            'image': row['image'] or None,
+            'parent': str(row['parent_id']) if row['parent_id'] else None,
+            'depth': row['path'].count('/') - 2,
+            'product_count': row['active_product_count'],
+            'children': [],
+        }
+        if row['parent_id'] is None:
+            roots.append(node)
+        elif row['parent_id'] in nodes:
+            nodes[row['parent_id']]['children'].append(node)
+        else:
+            continue
+        nodes[row['id']] = node
+    for node in reversed(list(nodes.values())):
+        node['subtree_product_count'] = node['product_count'] + sum(
+            child['subtree_product_count'] for child in node['children']
+        )
+    return roots
+
+
+def get_category_tree():
+    """
+    The category tree, cached under the version of the ``categories`` tag,
+    which category edits and product count changes invalidate.
+    """
+    key = CATEGORY_TREE_KEY.format(get_tag_versions(['categories'])['categories'])
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(key, tree, settings.HTTP_CACHE_TIMEOUT)
+    return tree
+
+
+def serialize_category_tree(tree, request):
+    """The cached tree with absolute image URLs and srcsets for ``request``, as CategorySerializer renders them."""
+    data = []
+    for node in tree:
+        image = request.build_absolute_uri(default_storage.url(node['image'])) if node['image'] else None
+        data.append({
+            **node,
+            'image': image,
+            'image_srcset': srcset(image),
+            'children': serialize_category_tree(node['children'], request),
+        })
+    return data
@@ -0,0 +1,200 @@
+from django.db.models import (
+    Avg, BooleanField, Case, Count, DecimalField, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Concat, Floor, Greatest, Round, Substr
+from django.db.models.lookups import GreaterThan
+from .models import Category, Product, ProductImage, ProductReview, ProductStats, ProductVariant
+
+RATING_STARS = range(1, 6)
+
+
+def primary_image_subquery():
+    return Subquery(
+        ProductImage.objects.filter(product=OuterRef('pk'), is_primary=True)
+        .order_by('order', 'id')
+        .values('image')[:1]
+    )
+
+
+def refresh_primary_image(product_id):
+    """Copy the current primary image path of one product onto the product row."""
+    image = (
+        ProductImage.objects.filter(product_id=product_id, is_primary=True)
+        .order_by('order', 'id')
+        .values_list('image', flat=True)
+        .first()
+    )
+    # update() keeps updated_at untouched: the merchandising data did not change
+    Product.objects.filter(pk=product_id).update(primary_image=image or '')
+
+
+def backfill_primary_images(queryset=None):
+    """Recompute primary_image for every product in ``queryset`` with one UPDATE."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.update(primary_image=Coalesce(primary_image_subquery(), Value('')))
+
+
+def discount_percentage_expression():
+    """SQL twin of Product.apply_sale_state's whole-percent discount, truncated like int()."""
+    return Case(
+        When(original_price__gt=F('price'), then=Cast(
+            Floor((F('original_price') - F('price')) * 100 / F('original_price')), IntegerField(),
+        )),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def refresh_sale_state(queryset=None):
+    """Recompute is_on_sale and discount_percentage for every product in ``queryset`` with one UPDATE."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.update(
+        is_on_sale=Case(When(original_price__gt=F('price'), then=Value(True)), default=Value(False),
+                        output_field=BooleanField()),
+        discount_percentage=discount_percentage_expression(),
+    )
+
+
+def adjust_product_stats(product_id, **deltas):
+    """
+    Atomically shift counters of one product, ``adjust_product_stats(pk,
+    stock_quantity=-2)``, with a single UPDATE ... SET x = x + n on its
+    ProductStats row. Counters do not go below zero.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or product_id is None:
+        return
+    ProductStats.objects.filter(product_id=product_id).update(**{
+        field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()
+    })
+
+
+def adjust_variant_stock(product_id, delta):
+    """Atomically shift a product's active variant stock by ``delta``."""
+    adjust_product_stats(product_id, variant_stock=delta)
+
+
+def variant_stock_subquery():
+    return Coalesce(
+        Subquery(
+            ProductVariant.objects.filter(product=OuterRef('product_id'), is_active=True)
+            .order_by()
+            .values('product')
+            .annotate(total=Sum('stock_quantity'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def rebuild_variant_stock(queryset=None):
+    """Recount the active variant stock of every product in ``queryset`` with one UPDATE."""
+    return _stats_of(queryset).update(variant_stock=variant_stock_subquery())
+
+
+def _stats_of(queryset):
+    if queryset is None:
+        return ProductStats.objects.all()
+    return ProductStats.objects.filter(product__in=queryset.values('pk'))
+
+
+def active_product_count_subquery():
+    return Coalesce(
+        Subquery(
+            Product.objects.filter(category=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('category')
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        Value(0),
+    )
+
+
+def adjust_active_product_count(category_id, delta):
+    """Atomically shift a category's active product counter by ``delta``."""
+    if not delta or category_id is None:
+        return
+    Category.objects.filter(pk=category_id).update(
+        active_product_count=Greatest(F('active_product_count') + delta, Value(0))
+    )
+
+
+def move_category_subtree(old_path, new_path):
+    """Re-root every category below ``old_path`` under ``new_path`` with one UPDATE."""
+    return Category.objects.filter(path__startswith=old_path).update(
+        path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+    )
+
+
+def reconcile_category_counts():
+    """
+    Recount active products per category and fix any counter that drifted.
+    Returns the number of categories whose stored counter was wrong.
+    """
+    drifted = (
+        Category.objects.annotate(actual=active_product_count_subquery())
+        .exclude(active_product_count=F('actual'))
+        .count()
+    )
+    if drifted:
+        Category.objects.update(active_product_count=active_product_count_subquery())
+    return drifted
+
+
+def adjust_review_aggregates(product_id, changes):
+    """
+    Apply review count changes ``{stars: delta}`` to a product in one atomic
+    UPDATE: running sum, count, star histogram and the rounded average. Every
+    right-hand side reads the row as it was before the statement, so concurrent
+    submissions serialize on the row lock instead of overwriting each other.
+    """
+    changes = {stars: delta for stars, delta in changes.items() if delta}
+    if not changes or product_id is None:
+        return
+    sum_delta = sum(stars * delta for stars, delta in changes.items())
+    count_delta = sum(changes.values())
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('review_count') + count_delta
+    ProductStats.objects.filter(product_id=product_id).update(
+        rating_sum=Greatest(new_sum, Value(0)),
+        review_count=Greatest(new_count, Value(0)),
+        rating=Case(
+            When(GreaterThan(new_count, 0), then=Cast(
+                Round(Cast(new_sum, FloatField()) / new_count, 2),
+                DecimalField(max_digits=3, decimal_places=2),
+            )),
+            default=Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        ),
+        **{
+            f'rating_{stars}_count': Greatest(F(f'rating_{stars}_count') + delta, Value(0))
+            for stars, delta in changes.items()
+        },
+    )
+
+
+def review_aggregate_subquery(aggregate):
+    return Coalesce(
+        Subquery(
+            ProductReview.objects.filter(product=OuterRef('product_id'))
+            .order_by()
+            .values('product')
+            .annotate(value=aggregate)
+            .values('value')
+        ),
+        Value(0),
+    )
+
+
+def rebuild_review_aggregates(queryset=None):
+    """Recompute every review aggregate of the products in ``queryset`` from the reviews table."""
+    return _stats_of(queryset).update(
+        review_count=review_aggregate_subquery(Count('pk')),
+        rating_sum=review_aggregate_subquery(Sum('rating')),
+        rating=review_aggregate_subquery(Round(Avg('rating'), 2, output_field=DecimalField(max_digits=3, decimal_places=2))),
+        **{
+            f'rating_{stars}_count': review_aggregate_subquery(Count('pk', filter=Q(rating=stars)))
+            for stars in RATING_STARS
+        },
+    )
@@ -0,0 +1,34 @@
+from django.db.models import F
+from apps.core.exports import export_iterator, grouped_rows
+from .models import Product
+
+PRODUCT_EXPORT_COLUMNS = [
+    # The leading columns match import_catalog --kind products, so an export can be re-imported
+    'sku', 'name', 'description', 'price', 'original_price', 'category', 'is_featured', 'is_active',
+    'stock_quantity', 'color', 'id', 'rating', 'review_count', 'created_at', 'updated_at', 'variants',
+]
+# Export columns read from the product's ProductStats row
+STATS_EXPORT_COLUMNS = ('stock_quantity', 'rating', 'review_count')
+VARIANT_EXPORT_FIELDS = {
+    f'variants__{field}': field
+    for field in ('type', 'name', 'value', 'price_adjustment', 'stock_quantity', 'is_active')
+}
+
+
+def product_export_rows(queryset=None, chunk_size=None):
+    """
+    One dict per product with its category name and variants, read as a
+    single LEFT JOIN off a server-side cursor rather than a query per chunk.
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    columns = [
+        column for column in PRODUCT_EXPORT_COLUMNS
+        if column not in ('category', 'variants') and column not in STATS_EXPORT_COLUMNS
+    ]
+    rows = queryset.order_by('pk', 'variants__id').values(
+        *columns, 'category__name', *VARIANT_EXPORT_FIELDS,
+        **{column: F(f'stats__{column}') for column in STATS_EXPORT_COLUMNS},
+    )
+    for product in grouped_rows(export_iterator(rows, chunk_size), 'id', VARIANT_EXPORT_FIELDS, 'variants'):
+        product['category'] = product.pop('category__name')
+        yield product
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, Value, When
+from .models import IN_STOCK
+
+# ProductFilter parameters that are also facets. Each facet is counted with
+# every other filter applied but not its own, so picking a category still
+# shows how many products the sibling categories hold.
+FACET_PARAMS = ('category', 'color', 'price_min', 'price_max', 'rating_min', 'in_stock', 'on_sale')
+
+RATING_BANDS = (4, 3, 2, 1)
+
+
+def _flag(condition):
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+def _price_bucket(edges):
+    return Case(
+        *[When(price__lt=edge, then=Value(index)) for index, edge in enumerate(edges)],
+        default=Value(len(edges)),
+        output_field=IntegerField(),
+    )
+
+
+def _rating_band():
+    return Case(
+        *[When(stats__rating__gte=band, then=Value(band)) for band in RATING_BANDS],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _matches(row, selection, skip):
+    category = selection.get('category')
+    # A selected category matches its whole subtree, as ProductFilter does
+    if skip != 'category' and category is not None and not row['category__path'].startswith(category.path):
+        return False
+    color = selection.get('color')
+    if skip != 'color' and color and (row['color'] or '').lower() != color.lower():
+        return False
+    if skip != 'price' and not row.get('in_price_range', True):
+        return False
+    if skip != 'rating' and not row.get('in_rating_range', True):
+        return False
+    if skip != 'in_stock' and selection.get('in_stock') and not row['in_stock']:
+        return False
+    # Unlike in_stock, ?on_sale=false is a filter too: full-price products only
+    on_sale = selection.get('on_sale')
+    if skip != 'on_sale' and on_sale is not None and row['is_on_sale'] != on_sale:
+        return False
+    return True
+
+
+def compute_facets(queryset, selection):
+    """
+    Facet counts for ``queryset`` (already narrowed by the non-facet filters)
+    under the facet ``selection`` (cleaned ProductFilter values).
+
+    Runs a single GROUP BY over every facet dimension at once; each facet is
+    then a sum over the grouped rows, skipping its own condition. The number of
+    groups is bounded by categories x colors x price buckets x rating bands.
+    """
+    edges = settings.PRODUCT_FACET_PRICE_EDGES
+    dimensions = {
+        'price_bucket': _price_bucket(edges),
+        'rating_band': _rating_band(),
+        'in_stock': _flag(IN_STOCK),
+    }
+    price_range = {}
+    if selection.get('price_min') is not None:
+        price_range['price__gte'] = selection['price_min']
+    if selection.get('price_max') is not None:
+        price_range['price__lte'] = selection['price_max']
+    if price_range:
+        dimensions['in_price_range'] = _flag(Q(**price_range))
+    if selection.get('rating_min') is not None:
+        dimensions['in_rating_range'] = _flag(Q(stats__rating__gte=selection['rating_min']))
+
+    rows = list(
+        queryset.order_by()
+        .annotate(**dimensions)
+        .values('category_id', 'category__name', 'category__path', 'color', 'is_on_sale', *dimensions)
+        .annotate(count=Count('pk'))
+    )
+
+    categories = {}
+    colors = {}
+    price_counts = [0] * (len(edges) + 1)
+    band_counts = dict.fromkeys(RATING_BANDS, 0)
+    total = in_stock = on_sale = 0
+    for row in rows:
+        count = row['count']
+        if _matches(row, selection, skip=None):
+            total += count
+        if _matches(row, selection, skip='category'):
+            entry = categories.setdefault(
+                row['category_id'], {'id': row['category_id'], 'name': row['category__name'], 'count': 0}
+            )
+            entry['count'] += count
+        if row['color'] and _matches(row, selection, skip='color'):
+            entry = colors.setdefault(row['color'].lower(), {'value': row['color'], 'count': 0})
+            entry['count'] += count
+        if _matches(row, selection, skip='price'):
+            price_counts[row['price_bucket']] += count
+        if _matches(row, selection, skip='rating'):
+            for band in RATING_BANDS:
+                if row['rating_band'] >= band:
+                    band_counts[band] += count
+        if row['in_stock'] and _matches(row, selection, skip='in_stock'):
+            in_stock += count
+        if row['is_on_sale'] and _matches(row, selection, skip='on_sale'):
+            on_sale += count
+
+    # Bucket bounds are [min, max); the first has no lower and the last no upper bound
+    bounds = [None, *edges, None]
+    return {
+        'total': total,
+        'categories': sorted(categories.values(), key=lambda entry: (-entry['count'], entry['name'])),
+        'colors': sorted(colors.values(), key=lambda entry: (-entry['count'], entry['value'].lower())),
+        'price_ranges': [
+            {'min': bounds[index], 'max': bounds[index + 1], 'count': count}
+            for index, count in enumerate(price_counts)
+        ],
+        'ratings': [{'min': band, 'count': band_counts[band]} for band in RATING_BANDS],
+        'in_stock': in_stock,
+        'on_sale': on_sale,
+    }
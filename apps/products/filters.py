@@ -1,21 +1,64 @@
 import django_filters
-from .models import Product, Category
+from rest_framework import filters
+from .models import IN_STOCK, Product, Category
+from .search import get_search_backend
 
 class ProductFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(lookup_expr='icontains')
-    category = django_filters.ModelChoiceFilter(queryset=Category.objects.all())
+    category = django_filters.ModelChoiceFilter(queryset=Category.objects.all(), method='filter_category')
     category_name = django_filters.CharFilter(field_name='category__name', lookup_expr='icontains')
     price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
-    rating_min = django_filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_min = django_filters.NumberFilter(field_name='stats__rating', lookup_expr='gte')
+    color = django_filters.CharFilter(lookup_expr='iexact')
     is_featured = django_filters.BooleanFilter()
     in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+    on_sale = django_filters.BooleanFilter(field_name='is_on_sale')
+    discount_min = django_filters.NumberFilter(field_name='discount_percentage', lookup_expr='gte')
     
     class Meta:
         model = Product
         fields = ['category', 'is_featured']
     
+    def filter_category(self, queryset, name, value):
+        # The category and everything below it, by a prefix match on the indexed path. The
+        # ids are read up front: for a leaf, category_id = X lets the planner use the
+        # (category, ordering) indexes, which it does not for an IN (subquery) semi-join
+        subtree = Category.objects.filter(path__startswith=value.path).values_list('pk', flat=True)
+        return queryset.filter(category__in=list(subtree))
+
     def filter_in_stock(self, queryset, name, value):
+        # ProductStats.variant_stock is the maintained rollup of its active variants' stock
         if value:
-            return queryset.filter(stock_quantity__gt=0)
+            return queryset.filter(IN_STOCK)
         return queryset
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """Delegates ?search= to the configured PRODUCT_SEARCH_BACKEND."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return get_search_backend().search(queryset, query)
+
+
+class RankAwareOrderingFilter(filters.OrderingFilter):
+    """
+    Keeps relevance order for ranked search results unless ?ordering= is given.
+    Public ordering names listed in the view's ``ordering_aliases`` are
+    translated to their model fields.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank', *self.get_default_ordering(view)]
+        ordering = super().get_ordering(request, queryset, view)
+        aliases = getattr(view, 'ordering_aliases', {})
+        if not ordering or not aliases:
+            return ordering
+        return [
+            ('-' if field.startswith('-') else '') + aliases.get(field.lstrip('-'), field.lstrip('-'))
+            for field in ordering
+        ]
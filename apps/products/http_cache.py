@@ -0,0 +1,117 @@
+import copy
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .cache import get_tag_versions
+from .models import Wishlist
+
+# Serialized product fields that carry the per-user wishlist flag
+WISHLIST_FLAG_FIELDS = ('is_wishlisted', 'isWishlisted')
+
+
+def _etag(*parts):
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
+def _response_key(request, extra):
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    identity = json.dumps(
+        [request.build_absolute_uri(request.path), request.accepted_renderer.format, params, extra], default=str
+    )
+    return f'products:response:{hashlib.md5(identity.encode()).hexdigest()}'
+
+
+def _wishlist_slots(data):
+    """Every (product dict, flag field) pair in a serialized payload."""
+    if isinstance(data, list):
+        for item in data:
+            yield from _wishlist_slots(item)
+    elif isinstance(data, dict):
+        for field in WISHLIST_FLAG_FIELDS:
+            if field in data and 'id' in data:
+                yield data, field
+        for value in data.values():
+            if isinstance(value, (list, dict)):
+                yield from _wishlist_slots(value)
+
+
+def _not_modified(request, etag):
+    tokens = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return tokens.strip() == '*' or f'"{etag}"' in [token.strip() for token in tokens.split(',')]
+
+
+def _respond(request, entry):
+    data, etag = entry['data'], entry['etag']
+    if request.user.is_authenticated:
+        # The shared body is copied and only the wishlist flags are personalised
+        data = copy.deepcopy(data)
+        slots = list(_wishlist_slots(data))
+        wishlisted = {
+            str(pk) for pk in Wishlist.objects.filter(
+                user=request.user, product_id__in={item['id'] for item, _ in slots}
+            ).values_list('product_id', flat=True)
+        } if slots else set()
+        for item, field in slots:
+            item[field] = item['id'] in wishlisted
+        etag = _etag(etag, *sorted(wishlisted))
+        cache_control = 'private, no-cache'
+    else:
+        cache_control = f'public, max-age={settings.HTTP_CACHE_MAX_AGE}'
+
+    if _not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = cache_control
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
+
+
+def cached_catalog_response(tags, key_extra=None):
+    """
+    Caches the payload of a read-only catalog handler.
+
+    The handler runs without user state (``request.shared_payload``) so the
+    payload can be shared. ``tags(request, kwargs, data)`` names the rows the
+    payload depends on. It is called once with ``data=None`` before the
+    handler runs and again with the payload, for tags only known from it. A
+    stored payload is served while none of its tags were invalidated since, and
+    a matching If-None-Match is answered with 304 from the cache alone for
+    anonymous visitors.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = _response_key(request, key_extra(request) if key_extra else None)
+            entry = cache.get(key)
+            if entry is not None and get_tag_versions(entry['tags']) != entry['tags']:
+                entry = None
+
+            if entry is None:
+                # Versions are read before the handler runs, so a write racing
+                # with it leaves the stored entry already stale
+                known = set(tags(request, kwargs, None))
+                versions = get_tag_versions(known)
+                request.shared_payload = True
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                versions.update(get_tag_versions(set(tags(request, kwargs, data)) - known))
+                entry = {
+                    'data': data,
+                    'etag': _etag(json.dumps(data, cls=JSONEncoder, sort_keys=True)),
+                    'tags': versions,
+                }
+                cache.set(key, entry, settings.HTTP_CACHE_TIMEOUT)
+
+            return _respond(request, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,582 @@
+import csv
+import io
+import json
+import uuid
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .cache import invalidate_tags
+from .denormalized import backfill_primary_images, rebuild_variant_stock, refresh_sale_state
+from .models import Category, Product, ProductImage, ProductStats, ProductVariant
+from .search import update_search_vectors
+from .similarity import embed_after_commit
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+# Reading
+
+class TrackedLines:
+    """Decoded lines of a binary file that remember the byte offset after the last line handed out."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.offset = handle.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raw = self.handle.readline()
+        if not raw:
+            raise StopIteration
+        self.offset += len(raw)
+        return raw.decode('utf-8')
+
+    def seek(self, offset):
+        self.handle.seek(offset)
+        self.offset = offset
+
+
+def read_records(handle, file_format, offset=0):
+    """
+    Yield ``(record, offset)`` pairs from a binary CSV or JSONL file, where
+    ``offset`` is the byte position right after the record. Reading starts at
+    ``offset``; CSV headers are always read from the top of the file.
+    Unparseable records are yielded as InvalidRecord instances.
+    """
+    lines = TrackedLines(handle)
+    if file_format == 'csv':
+        # csv.reader pulls exactly the lines of one row, so offsets stay exact
+        # even for quoted values spanning several lines
+        reader = csv.reader(lines)
+        header = [column.strip().lstrip('﻿') for column in next(reader, [])]
+        if offset:
+            lines.seek(offset)
+        for row in reader:
+            if not any(row):
+                continue
+            if len(row) != len(header):
+                yield InvalidRecord(f'expected {len(header)} columns, got {len(row)}'), lines.offset
+                continue
+            yield dict(zip(header, row)), lines.offset
+        return
+
+    lines.seek(offset)
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield InvalidRecord(f'invalid JSON: {exc}'), lines.offset
+            continue
+        if not isinstance(record, dict):
+            yield InvalidRecord('expected a JSON object'), lines.offset
+            continue
+        yield record, lines.offset
+
+
+# Value parsing. CSV gives strings and JSONL typed values; empty means "no value".
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def parse_text(value):
+    return None if _blank(value) else str(value).strip()
+
+
+def parse_decimal(value):
+    if _blank(value):
+        return None
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation:
+        raise InvalidRecord(f'not a number: {value!r}')
+
+
+def parse_integer(value):
+    if _blank(value):
+        return None
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise InvalidRecord(f'not an integer: {value!r}')
+    if number < 0:
+        raise InvalidRecord(f'must not be negative: {value!r}')
+    return number
+
+
+def parse_boolean(value):
+    if _blank(value):
+        return None
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in ('1', 'true', 'yes', 'y', 't'):
+        return True
+    if normalized in ('0', 'false', 'no', 'n', 'f'):
+        return False
+    raise InvalidRecord(f'not a boolean: {value!r}')
+
+
+# Loaders
+
+NULL_MARKER = r'\N'
+
+class CatalogLoader:
+    """
+    Upserts one kind of catalog record in chunks. ``fields`` maps record keys
+    to (column, parser, staging SQL type). Only columns present in the input
+    are written on update, so partial feeds (say sku + stock_quantity) leave
+    everything else alone.
+    """
+
+    kind = None
+    fields = {}
+    key_fields = ()
+    staging_table = None
+    # Columns an explicit null clears; a record that omits them leaves them alone
+    nullable = set()
+
+    def __init__(self):
+        self.categories = {}
+
+    def clean(self, record):
+        row = {}
+        for field, (column, parser, _) in self.fields.items():
+            if field in record:
+                row[column] = parser(record[field])
+        for field in self.key_fields:
+            column = self.fields[field][0]
+            if _blank(row.get(column)):
+                raise InvalidRecord(f'{field} is required')
+        return row
+
+    def key(self, row):
+        return tuple(row[self.fields[field][0]] for field in self.key_fields)
+
+    def load(self, rows, present):
+        """Write one chunk; returns (written, rejected, affected product ids)."""
+        if connection.vendor == 'postgresql':
+            return self.load_postgres(rows, present)
+        return self.load_orm(rows, present)
+
+    # PostgreSQL: COPY into a temporary staging table, then set-based merges
+
+    @staticmethod
+    def carried_flag(column):
+        """Staging column recording whether a row carried the nullable ``column``."""
+        return f'{column}_carried'
+
+    def stage(self, rows):
+        columns = [column for column, _, _ in self.fields.values()]
+        flags = sorted(self.nullable)
+        column_list = ', '.join(f'"{column}"' for column in [*columns, *map(self.carried_flag, flags)])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS {self.staging_table} ('
+                + ', '.join(
+                    [f'"{column}" {sql_type}' for column, _, sql_type in self.fields.values()]
+                    + [f'"{self.carried_flag(column)}" boolean' for column in flags]
+                )
+                + ') ON COMMIT DELETE ROWS'
+            )
+            # csv quotes None as "" like an empty string, so NULL gets its own marker
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(
+                    [NULL_MARKER if row.get(column) is None else row[column] for column in columns]
+                    + [column in row for column in flags]
+                )
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {self.staging_table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')",
+                buffer,
+            )
+
+    def load_postgres(self, rows, present):
+        raise NotImplementedError
+
+    def load_orm(self, rows, present):
+        raise NotImplementedError
+
+    def product_ids_by_sku(self, skus):
+        return dict(Product.objects.filter(sku__in=skus).values_list('sku', 'pk'))
+
+
+class CategoryLoader(CatalogLoader):
+    kind = 'categories'
+    staging_table = 'import_categories'
+    key_fields = ('name',)
+    fields = {
+        'name': ('name', parse_text, 'text'),
+        'description': ('description', parse_text, 'text'),
+        'is_active': ('is_active', parse_boolean, 'boolean'),
+    }
+
+    def load_postgres(self, rows, present):
+        self.stage(rows)
+        assignments = ', '.join(
+            f'{column} = COALESCE(s.{column}, c.{column})' for column in present - {'name'}
+        )
+        with connection.cursor() as cursor:
+            if assignments:
+                cursor.execute(
+                    f'UPDATE products_category c SET {assignments} FROM {self.staging_table} s WHERE c.name = s.name'
+                )
+            cursor.execute(f'''
+                INSERT INTO products_category (id, name, description, is_active, created_at, active_product_count, path)
+                SELECT s.id, s.name, COALESCE(s.description, ''), COALESCE(s.is_active, true), now(), 0,
+                       '/' || replace(s.id::text, '-', '') || '/'
+                FROM (
+                    SELECT gen_random_uuid() AS id, n.* FROM {self.staging_table} n
+                    WHERE NOT EXISTS (SELECT 1 FROM products_category c WHERE c.name = n.name)
+                ) s
+            ''')
+        return len(rows), 0, []
+
+    def load_orm(self, rows, present):
+        existing = {}
+        for category in Category.objects.filter(name__in=[row['name'] for row in rows]):
+            existing.setdefault(category.name, category)
+        changed, created = [], []
+        for row in rows:
+            category = existing.get(row['name'])
+            if category is None:
+                # Imported categories are roots; bulk_create skips save(), which sets the path
+                pk = uuid.uuid4()
+                created.append(Category(
+                    id=pk, path=Category.build_path(pk), name=row['name'], description=row.get('description') or '',
+                    is_active=row.get('is_active', True) is not False,
+                ))
+                continue
+            for column in present - {'name'}:
+                if row.get(column) is not None:
+                    setattr(category, column, row[column])
+            changed.append(category)
+        if changed and present - {'name'}:
+            Category.objects.bulk_update(changed, list(present - {'name'}))
+        Category.objects.bulk_create(created)
+        return len(changed) + len(created), 0, []
+
+
+class ProductLoader(CatalogLoader):
+    kind = 'products'
+    staging_table = 'import_products'
+    key_fields = ('sku',)
+    fields = {
+        'sku': ('sku', parse_text, 'text'),
+        'name': ('name', parse_text, 'text'),
+        'description': ('description', parse_text, 'text'),
+        'price': ('price', parse_decimal, 'numeric(10, 2)'),
+        'original_price': ('original_price', parse_decimal, 'numeric(10, 2)'),
+        # Category name, resolved to its id in clean()
+        'category': ('category_id', parse_text, 'uuid'),
+        'is_featured': ('is_featured', parse_boolean, 'boolean'),
+        'is_active': ('is_active', parse_boolean, 'boolean'),
+        'stock_quantity': ('stock_quantity', parse_integer, 'integer'),
+        'color': ('color', parse_text, 'text'),
+    }
+    # Columns a new product cannot be created without
+    insert_required = ('name', 'price', 'category_id')
+    nullable = {'original_price', 'color'}
+    # Columns of the product's ProductStats row; a stock-only feed leaves products_product alone
+    stats_columns = {'stock_quantity'}
+
+    def __init__(self):
+        super().__init__()
+        self.categories = dict(Category.objects.values_list('name', 'pk'))
+
+    def clean(self, record):
+        row = super().clean(record)
+        name = row.get('category_id')
+        if name is not None:
+            if name not in self.categories:
+                # Categories created since the loader started, e.g. by an earlier chunk
+                self.categories.update(Category.objects.filter(name=name).values_list('name', 'pk')[:1])
+            if name not in self.categories:
+                raise InvalidRecord(f'unknown category: {name!r}')
+            row['category_id'] = self.categories[name]
+        return row
+
+    def update_columns(self, present):
+        return sorted(present - {'sku'} - self.stats_columns)
+
+    def load_postgres(self, rows, present):
+        self.stage(rows)
+        assignments = [
+            f'{column} = CASE WHEN s.{self.carried_flag(column)} THEN s.{column} ELSE p.{column} END'
+            if column in self.nullable else f'{column} = COALESCE(s.{column}, p.{column})'
+            for column in self.update_columns(present)
+        ]
+        affected = {}
+        with connection.cursor() as cursor:
+            if assignments:
+                cursor.execute(f'''
+                    UPDATE products_product p
+                    SET {', '.join([*assignments, 'updated_at = now()'])}
+                    FROM {self.staging_table} s
+                    WHERE p.sku = s.sku
+                    RETURNING p.id
+                ''')
+                affected.update(dict.fromkeys(row[0] for row in cursor.fetchall()))
+            if 'stock_quantity' in present:
+                cursor.execute(f'''
+                    UPDATE products_productstats st
+                    SET stock_quantity = COALESCE(s.stock_quantity, st.stock_quantity)
+                    FROM {self.staging_table} s JOIN products_product p ON p.sku = s.sku
+                    WHERE st.product_id = p.id
+                    RETURNING st.product_id
+                ''')
+                affected.update(dict.fromkeys(row[0] for row in cursor.fetchall()))
+            # The sale state columns are derived from the prices in refresh_derived_data
+            cursor.execute(f'''
+                WITH created AS (
+                    INSERT INTO products_product (
+                        id, sku, name, description, price, original_price, category_id, is_featured, is_active,
+                        color, created_at, updated_at, primary_image, discount_percentage, is_on_sale
+                    )
+                    SELECT
+                        gen_random_uuid(), s.sku, s.name, COALESCE(s.description, ''), s.price, s.original_price,
+                        s.category_id, COALESCE(s.is_featured, false), COALESCE(s.is_active, true),
+                        s.color, now(), now(), '', 0, false
+                    FROM {self.staging_table} s
+                    WHERE s.name IS NOT NULL AND s.price IS NOT NULL AND s.category_id IS NOT NULL
+                      AND NOT EXISTS (SELECT 1 FROM products_product p WHERE p.sku = s.sku)
+                    RETURNING id, sku
+                )
+                INSERT INTO products_productstats (
+                    product_id, stock_quantity, variant_stock, rating, review_count,
+                    rating_sum, rating_1_count, rating_2_count, rating_3_count, rating_4_count, rating_5_count
+                )
+                SELECT c.id, COALESCE(s.stock_quantity, 0), 0, 0, 0, 0, 0, 0, 0, 0, 0
+                FROM created c JOIN {self.staging_table} s ON s.sku = c.sku
+                RETURNING product_id
+            ''')
+            affected.update(dict.fromkeys(row[0] for row in cursor.fetchall()))
+        affected = list(affected)
+        return len(affected), len(rows) - len(affected), affected
+
+    def load_orm(self, rows, present):
+        existing = Product.objects.in_bulk([row['sku'] for row in rows], field_name='sku')
+        columns = self.update_columns(present)
+        now = timezone.now()
+        changed, created, stocked, rejected = [], [], [], 0
+        for row in rows:
+            product = existing.get(row['sku'])
+            if product is None:
+                if any(row.get(column) is None for column in self.insert_required):
+                    rejected += 1
+                    continue
+                product = Product(
+                    sku=row['sku'], name=row['name'], description=row.get('description') or '',
+                    price=row['price'], original_price=row.get('original_price'),
+                    category_id=row['category_id'], is_featured=bool(row.get('is_featured')),
+                    is_active=row.get('is_active') is not False, color=row.get('color'),
+                )
+                created.append(product)
+                continue
+            if row.get('stock_quantity') is not None:
+                stocked.append(ProductStats(product=product, stock_quantity=row['stock_quantity']))
+            for column in columns:
+                # present spans the whole chunk; this row may not carry the column at all
+                if column in row and (column in self.nullable or row[column] is not None):
+                    setattr(product, column, row[column])
+            product.updated_at = now
+            changed.append(product)
+        if changed and columns:
+            Product.objects.bulk_update(changed, [*columns, 'updated_at'])
+        # Existing products only get their stock written, never the counters around it
+        ProductStats.objects.bulk_update(stocked, ['stock_quantity'])
+        Product.objects.bulk_create(created)
+        new_rows = {row['sku']: row for row in rows}
+        ProductStats.objects.bulk_create([
+            ProductStats(product=product, stock_quantity=new_rows[product.sku].get('stock_quantity') or 0)
+            for product in created
+        ])
+        affected = [product.pk for product in changed + created]
+        return len(affected), rejected, affected
+
+
+class ImageLoader(CatalogLoader):
+    kind = 'images'
+    staging_table = 'import_images'
+    key_fields = ('sku', 'image')
+    fields = {
+        'sku': ('sku', parse_text, 'text'),
+        'image': ('image', parse_text, 'text'),
+        'alt_text': ('alt_text', parse_text, 'text'),
+        'is_primary': ('is_primary', parse_boolean, 'boolean'),
+        'order': ('order', parse_integer, 'integer'),
+    }
+
+    def load_postgres(self, rows, present):
+        self.stage(rows)
+        assignments = ', '.join(
+            f'"{column}" = COALESCE(s."{column}", i."{column}")' for column in sorted(present - {'sku', 'image'})
+        )
+        with connection.cursor() as cursor:
+            if assignments:
+                cursor.execute(f'''
+                    UPDATE products_productimage i SET {assignments}
+                    FROM {self.staging_table} s JOIN products_product p ON p.sku = s.sku
+                    WHERE i.product_id = p.id AND i.image = s.image
+                ''')
+            cursor.execute(f'''
+                INSERT INTO products_productimage (product_id, image, alt_text, is_primary, "order")
+                SELECT p.id, s.image, COALESCE(s.alt_text, ''), COALESCE(s.is_primary, false), COALESCE(s."order", 0)
+                FROM {self.staging_table} s JOIN products_product p ON p.sku = s.sku
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM products_productimage i WHERE i.product_id = p.id AND i.image = s.image
+                )
+            ''')
+            cursor.execute(
+                f'SELECT DISTINCT p.id FROM {self.staging_table} s JOIN products_product p ON p.sku = s.sku'
+            )
+            affected = [row[0] for row in cursor.fetchall()]
+        rejected = self.count_unknown_skus(rows)
+        return len(rows) - rejected, rejected, affected
+
+    def count_unknown_skus(self, rows):
+        known = self.product_ids_by_sku({row['sku'] for row in rows})
+        return sum(1 for row in rows if row['sku'] not in known)
+
+    def load_orm(self, rows, present):
+        product_ids = self.product_ids_by_sku({row['sku'] for row in rows})
+        existing = {
+            (image.product_id, image.image.name): image
+            for image in ProductImage.objects.filter(
+                product_id__in=product_ids.values(), image__in=[row['image'] for row in rows]
+            )
+        }
+        columns = sorted(present - {'sku', 'image'})
+        changed, created, rejected = [], [], 0
+        for row in rows:
+            product_id = product_ids.get(row['sku'])
+            if product_id is None:
+                rejected += 1
+                continue
+            image = existing.get((product_id, row['image']))
+            if image is None:
+                created.append(ProductImage(
+                    product_id=product_id, image=row['image'], alt_text=row.get('alt_text') or '',
+                    is_primary=bool(row.get('is_primary')), order=row.get('order') or 0,
+                ))
+                continue
+            for column in columns:
+                if row.get(column) is not None:
+                    setattr(image, column, row[column])
+            changed.append(image)
+        if changed and columns:
+            ProductImage.objects.bulk_update(changed, columns)
+        ProductImage.objects.bulk_create(created)
+        affected = {image.product_id for image in changed + created}
+        return len(changed) + len(created), rejected, list(affected)
+
+
+class VariantLoader(CatalogLoader):
+    kind = 'variants'
+    staging_table = 'import_variants'
+    key_fields = ('sku', 'type', 'value')
+    fields = {
+        'sku': ('sku', parse_text, 'text'),
+        'type': ('type', parse_text, 'text'),
+        'name': ('name', parse_text, 'text'),
+        'value': ('value', parse_text, 'text'),
+        'price_adjustment': ('price_adjustment', parse_decimal, 'numeric(10, 2)'),
+        'stock_quantity': ('stock_quantity', parse_integer, 'integer'),
+        'is_active': ('is_active', parse_boolean, 'boolean'),
+    }
+    variant_types = {choice for choice, _ in ProductVariant.VARIANT_TYPES}
+
+    def clean(self, record):
+        row = super().clean(record)
+        if row['type'] not in self.variant_types:
+            raise InvalidRecord(f"type must be one of: {', '.join(sorted(self.variant_types))}")
+        return row
+
+    def load_postgres(self, rows, present):
+        self.stage(rows)
+        assignments = ', '.join(
+            f'{column} = COALESCE(EXCLUDED.{column}, v.{column})'
+            for column in sorted(present - {'sku', 'type', 'value'})
+        ) or 'name = v.name'
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                INSERT INTO products_productvariant AS v
+                    (product_id, type, name, value, price_adjustment, stock_quantity, is_active)
+                SELECT p.id, s.type, COALESCE(s.name, s.value), s.value, COALESCE(s.price_adjustment, 0),
+                       COALESCE(s.stock_quantity, 0), COALESCE(s.is_active, true)
+                FROM {self.staging_table} s JOIN products_product p ON p.sku = s.sku
+                ON CONFLICT (product_id, type, value) DO UPDATE SET {assignments}
+                RETURNING product_id
+            ''')
+            affected = {row[0] for row in cursor.fetchall()}
+            written = cursor.rowcount
+        return written, len(rows) - written, list(affected)
+
+    def load_orm(self, rows, present):
+        product_ids = self.product_ids_by_sku({row['sku'] for row in rows})
+        existing = {
+            (variant.product_id, variant.type, variant.value): variant
+            for variant in ProductVariant.objects.filter(
+                product_id__in=product_ids.values(), value__in=[row['value'] for row in rows]
+            )
+        }
+        columns = sorted(present - {'sku', 'type', 'value'})
+        changed, created, rejected = [], [], 0
+        for row in rows:
+            product_id = product_ids.get(row['sku'])
+            if product_id is None:
+                rejected += 1
+                continue
+            variant = existing.get((product_id, row['type'], row['value']))
+            if variant is None:
+                created.append(ProductVariant(
+                    product_id=product_id, type=row['type'], name=row.get('name') or row['value'],
+                    value=row['value'], price_adjustment=row.get('price_adjustment') or 0,
+                    stock_quantity=row.get('stock_quantity') or 0, is_active=row.get('is_active') is not False,
+                ))
+                continue
+            for column in columns:
+                if row.get(column) is not None:
+                    setattr(variant, column, row[column])
+            changed.append(variant)
+        if changed and columns:
+            ProductVariant.objects.bulk_update(changed, columns)
+        ProductVariant.objects.bulk_create(created)
+        affected = {variant.product_id for variant in changed + created}
+        return len(changed) + len(created), rejected, list(affected)
+
+
+LOADERS = {loader.kind: loader for loader in (CategoryLoader, ProductLoader, ImageLoader, VariantLoader)}
+
+
+def refresh_derived_data(kind, product_ids, present=()):
+    """
+    Denormalized columns the loaders bypass, refreshed for one chunk's
+    products. ``present`` holds the columns the chunk carried, so product
+    feeds only rewrite what their columns feed into.
+    """
+    products = Product.objects.filter(pk__in=product_ids)
+    if kind == 'products':
+        if {'name', 'description', 'category_id'} & set(present):
+            update_search_vectors(products)
+        if {'price', 'original_price'} & set(present):
+            refresh_sale_state(products)
+        # COPY writes skip the save signals that re-embed products
+        embedded = {'name', 'description', 'category_id', 'color', 'is_active'}
+        if settings.PRODUCT_EMBEDDINGS_ON_SAVE and embedded & set(present):
+            embed_after_commit(products)
+    elif kind == 'images':
+        backfill_primary_images(products)
+    elif kind == 'variants':
+        rebuild_variant_stock(products)
+    tags = [f'product:{product_id}' for product_id in product_ids]
+    transaction.on_commit(lambda: invalidate_tags(tags))
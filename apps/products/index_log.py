@@ -0,0 +1,111 @@
+import logging
+import threading
+from django.core.cache import cache
+from django.db import connection
+from .cache import bump_tag, get_tag_versions
+
+logger = logging.getLogger(__name__)
+
+# Log entry for changes too large to replay row by row, such as catalog imports
+REBUILD = ('rebuild', None)
+
+
+class ChangeLog:
+    """
+    Numbered log of changed catalog rows in the shared cache, one per in-memory
+    index. Entries only name a row, ``('product', id)`` or ``('category', id)``:
+    a process replaying them reloads the current rows, so entries can be
+    applied more than once and in any order.
+    """
+
+    timeout = 3600
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    def _key(self, version):
+        return f'products:log:{self.tag}:{version}'
+
+    def version(self):
+        return get_tag_versions([self.tag])[self.tag]
+
+    def append(self, *entries):
+        # The entry is stored before the version moves past it, so readers never
+        # see a version whose entries are not written yet
+        slot = self.version() + 1
+        while not cache.add(self._key(slot), list(entries), self.timeout):
+            slot += 1
+        bump_tag(self.tag)
+
+    def read(self, after, until):
+        """Entries after version ``after`` up to ``until``, or None once some have expired."""
+        keys = [self._key(version) for version in range(after + 1, until + 1)]
+        found = cache.get_many(keys)
+        if len(found) < len(keys):
+            return None
+        return [entry for key in keys for entry in found[key]]
+
+
+class IndexReplica:
+    """
+    This process's copy of an in-memory index. The first build runs on the
+    calling thread. After that, lookups replay the log entries written since
+    through the index's ``replay()``; a copy too far behind to replay is
+    rebuilt on a background thread and swapped in while the old one keeps
+    serving.
+    """
+
+    max_replay = 1000
+
+    def __init__(self, factory, log):
+        self.factory = factory
+        self.log = log
+        self.index = factory()
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def get(self):
+        if not self.index.is_built:
+            with self._lock:
+                if not self.index.is_built:
+                    # Read before building, so changes committed during the build are replayed
+                    self.index.build(self.log.version())
+            return self.index
+        self.catch_up()
+        return self.index
+
+    def if_built(self):
+        return self.index if self.index.is_built else None
+
+    def catch_up(self):
+        version = self.log.version()
+        # A lookup racing another thread's replay serves the copy as it is
+        if version == self.index.version or self._rebuilding or not self._lock.acquire(blocking=False):
+            return
+        try:
+            index = self.index
+            behind = version - index.version
+            entries = self.log.read(index.version, version) if 0 < behind <= self.max_replay else None
+            if entries is None or REBUILD in entries:
+                self.rebuild_in_background()
+            else:
+                index.replay(entries)
+                index.version = version
+        finally:
+            self._lock.release()
+
+    def rebuild_in_background(self):
+        self._rebuilding = True
+        threading.Thread(target=self._rebuild, name=f'rebuild-{self.log.tag}', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            index = self.factory()
+            index.build(self.log.version())
+            self.index = index
+        except Exception:
+            # The old copy keeps serving; the next lookup that finds it behind retries
+            logger.exception('Could not rebuild the %s', self.log.tag)
+        finally:
+            self._rebuilding = False
+            connection.close()
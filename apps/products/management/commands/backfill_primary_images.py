@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from apps.products.denormalized import backfill_primary_images
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Copy each product\'s primary image path onto Product.primary_image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of products updated per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = Product.objects.order_by('pk').values_list('pk', flat=True)
+        total = 0
+        batch = []
+        for product_id in ids.iterator(chunk_size=batch_size):
+            batch.append(product_id)
+            if len(batch) >= batch_size:
+                total += backfill_primary_images(Product.objects.filter(pk__in=batch))
+                batch = []
+        if batch:
+            total += backfill_primary_images(Product.objects.filter(pk__in=batch))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Backfilled primary image for {total} products'))
@@ -0,0 +1,88 @@
+import json
+import random
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+from apps.products.models import Category, Product, ProductStats
+from apps.products.serializers import ProductListSerializer, product_list_rows, serialize_product_rows
+
+SIZES = (20, 200, 2000)
+
+
+def listed_products():
+    # A fresh queryset per run, so neither path reads the other's result cache
+    return Product.objects.filter(is_active=True).select_related('category', 'stats').order_by('-created_at', 'id')
+
+
+class Command(BaseCommand):
+    help = 'Check that the values() product list path matches ProductListSerializer and compare their throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=7, help='Runs per size and path')
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/products/products/', HTTP_HOST='localhost')
+        context = {'request': request}
+
+        # The synthetic catalog lives in a transaction that is rolled back at the end
+        with transaction.atomic():
+            self.seed(max(SIZES))
+            serializer_data = ProductListSerializer(listed_products(), many=True, context=context).data
+            fast_data = serialize_product_rows(product_list_rows(listed_products()), context)
+            # Compared as rendered JSON, which is what clients see
+            if json.dumps(serializer_data, cls=JSONEncoder) != json.dumps(fast_data, cls=JSONEncoder):
+                raise CommandError('serialize_product_rows output differs from ProductListSerializer')
+            self.stdout.write(self.style.SUCCESS(f'✅ Identical output for {len(fast_data)} products'))
+
+            self.stdout.write(f"{'rows':>6}{'serializer rows/s':>20}{'values() rows/s':>18}{'speedup':>9}")
+            for size in SIZES:
+                slow = self.measure(options['repeat'], lambda: ProductListSerializer(
+                    listed_products()[:size], many=True, context=context
+                ).data)
+                fast = self.measure(options['repeat'], lambda: serialize_product_rows(
+                    product_list_rows(listed_products())[:size], context
+                ))
+                self.stdout.write(f'{size:>6}{size / slow:>20,.0f}{size / fast:>18,.0f}{slow / fast:>8.1f}x')
+            transaction.set_rollback(True)
+
+    def measure(self, repeat, serialize):
+        """Median seconds per run, query included, as a request would pay it."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    def seed(self, product_count):
+        rng = random.Random(7)
+        categories = Category.objects.bulk_create([Category(name=f'Benchmark {i}') for i in range(10)])
+        products, stats = [], []
+        for i in range(product_count):
+            price = rng.randint(5, 500)
+            products.append(Product(
+                id=uuid.uuid4(),
+                name=f'Benchmark product {i}',
+                description='Synthetic product',
+                price=price,
+                # Mix of no original price, a discount and an original price below the price
+                original_price=rng.choice([None, price + rng.randint(1, 200), max(price - 1, 1)]),
+                category=rng.choice(categories),
+                sku=f'SERIALIZER-BENCH-{i}',
+                is_featured=rng.random() < 0.2,
+                primary_image=rng.choice(['', f'products/bench-{i}.jpg']),
+            ))
+            # bulk_create skips Product.save() and the signal creating the stats row
+            products[-1].apply_sale_state()
+            stats.append(ProductStats(
+                product=products[-1],
+                rating=rng.randint(0, 500) / 100,
+                review_count=rng.randint(0, 1000),
+                stock_quantity=rng.choice([0, rng.randint(1, 50)]),
+            ))
+        Product.objects.bulk_create(products, batch_size=1000)
+        ProductStats.objects.bulk_create(stats, batch_size=1000)
@@ -0,0 +1,102 @@
+import math
+import random
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from apps.products.models import Category, Product
+from apps.products.search import IContainsSearchBackend, PostgresSearchBackend, update_search_vectors
+from apps.products.search_index import ProductSearchIndex
+
+ADJECTIVES = ['wireless', 'portable', 'ergonomic', 'compact', 'premium', 'vintage', 'smart', 'organic',
+              'waterproof', 'lightweight', 'classic', 'deluxe', 'rechargeable', 'adjustable', 'foldable']
+NOUNS = ['headphones', 'speaker', 'keyboard', 'backpack', 'lamp', 'watch', 'blender', 'jacket',
+         'sneakers', 'camera', 'charger', 'mattress', 'bottle', 'monitor', 'drone', 'kettle']
+FILLER = ['durable', 'design', 'everyday', 'battery', 'comfort', 'travel', 'home', 'office',
+          'quality', 'material', 'warranty', 'performance', 'style', 'fit', 'sound', 'power']
+QUERIES = ['wireless headphones', 'headph', 'smart watch', 'waterproof jacket', 'kettle', 'ergo keyb',
+           'battery', 'wireles headphnes', 'zzzz-no-match']
+
+
+class Command(BaseCommand):
+    help = 'Compare the product search backends on a synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query and backend')
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        backends = {'icontains': IContainsSearchBackend()}
+        if connection.vendor == 'postgresql':
+            backends['fulltext'] = PostgresSearchBackend()
+        else:
+            self.stdout.write(self.style.WARNING('⚠️  Not on PostgreSQL, skipping the full-text backend'))
+
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the synthetic catalog never reaches the real tables.
+        with transaction.atomic():
+            self.seed(options['products'], options['categories'])
+            self.stdout.write(f"{'query':<22}{'backend':<11}{'hits':>8}{'mean ms':>10}{'p95 ms':>10}")
+            for query in QUERIES:
+                for name, backend in backends.items():
+                    hits, timings = self.run_query(backend, query, options['repeat'], options['page_size'])
+                    self.report(query, name, hits, timings)
+
+            # The in-memory index answers without the database, so time retrieval on its own
+            started = time.perf_counter()
+            index = ProductSearchIndex()
+            index.build()
+            self.stdout.write(f'\nBuilt in-memory index in {time.perf_counter() - started:.1f}s')
+            for query in QUERIES:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    hits = len(index.search(query))
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.report(query, 'memory', hits, timings)
+            transaction.set_rollback(True)
+
+    def report(self, query, backend, hits, timings):
+        p95 = sorted(timings)[math.ceil(len(timings) * 0.95) - 1]
+        self.stdout.write(f'{query:<22}{backend:<11}{hits:>8}{statistics.mean(timings):>10.2f}{p95:>10.2f}')
+
+    def seed(self, product_count, category_count):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        categories = Category.objects.bulk_create([
+            Category(name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {i}')
+            for i in range(category_count)
+        ])
+        batch = []
+        for i in range(product_count):
+            batch.append(Product(
+                id=uuid.uuid4(),
+                name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {i}',
+                description=' '.join(rng.choices(FILLER + NOUNS, k=40)),
+                price=rng.randint(5, 500),
+                category=rng.choice(categories),
+                sku=f'BENCH-{i}',
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        if connection.vendor == 'postgresql':
+            update_search_vectors()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE products_product')
+        self.stdout.write(f'Seeded {product_count} products in {time.perf_counter() - started:.1f}s\n')
+
+    def run_query(self, backend, query, repeat, page_size):
+        timings = []
+        hits = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend.search(Product.objects.filter(is_active=True).select_related('category'), query)
+            hits = queryset.count()
+            list(queryset[:page_size])
+            timings.append((time.perf_counter() - started) * 1000)
+        return hits, timings
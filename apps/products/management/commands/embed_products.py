@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.products.similarity import embed_products, get_embedder
+
+
+class Command(BaseCommand):
+    help = 'Embed products whose name, description, category or color changed, for "similar products"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Re-embed every active product, e.g. after changing the provider settings')
+        parser.add_argument('--batch-size', type=int, default=500, help='Products embedded and written at a time')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        started = time.perf_counter()
+        checked, embedded, removed = embed_products(full=options['full'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Checked {checked:,} active products with {get_embedder().name}: embedded {embedded:,}, '
+            f'removed {removed:,} vectors of inactive products in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,229 @@
+import json
+import random
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.products.denormalized import refresh_sale_state
+from apps.products.models import Category, Product, ProductStats
+from apps.products.search import update_search_vectors
+from apps.products.serializers import product_list_rows
+from apps.products.views import ProductViewSet
+
+# ProductFilter combinations the storefront sends; {category} and {category_name}
+# are filled in with the largest leaf category, {department} with the category
+# holding the most subcategories. ?name= is left out on purpose: a
+# substring match needs a trigram index, ?search= is the indexed text filter.
+FILTERS = {
+    'all': {},
+    'category': {'category': '{category}'},
+    'category_name': {'category_name': '{category_name}'},
+    'department': {'category': '{department}'},
+    'featured': {'is_featured': 'true'},
+    'price': {'price_min': '100', 'price_max': '150'},
+    'in_stock': {'in_stock': 'true'},
+    'rating': {'rating_min': '4.5'},
+    'color': {'color': 'red'},
+    'category+price': {'category': '{category}', 'price_min': '100', 'price_max': '300'},
+    'category+in_stock': {'category': '{category}', 'in_stock': 'true'},
+    'featured+in_stock': {'is_featured': 'true', 'in_stock': 'true'},
+    'on_sale': {'on_sale': 'true'},
+    'discount': {'discount_min': '30'},
+    'category+on_sale': {'category': '{category}', 'on_sale': 'true'},
+    'search': {'search': 'wireless headphones'},
+}
+ORDERINGS = ['-created_at', 'created_at', 'price', '-price', 'rating', '-rating', 'discount', '-discount']
+# Counters live in the narrow ProductStats table. A page query scanning it sequentially
+# sorts the whole catalog; an exact COUNT(*) of a small result set may hash join it whole,
+# which costs about what the primary key probes it replaces do
+TABLES = [Product._meta.db_table, ProductStats._meta.db_table]
+# Page numbers, the first keyset page and the keyset page its next link points to
+PAGINATIONS = ['page', 'cursor', 'cursor-next']
+
+COLORS = ['red', 'blue', 'black', 'white', 'green', 'grey', 'navy', 'pink', 'beige', 'brown', 'silver', 'gold']
+WORDS = ['wireless', 'headphones', 'portable', 'speaker', 'cotton', 'shirt', 'leather', 'jacket', 'smart',
+         'watch', 'ceramic', 'mug', 'ergonomic', 'chair', 'gaming', 'keyboard', 'steel', 'bottle']
+
+
+def sequential_scans(plan, table):
+    """Sequential scan nodes over ``table`` anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') == table:
+        found.append(plan)
+    for child in plan.get('Plans', []):
+        found.extend(sequential_scans(child, table))
+    return found
+
+
+def index_names(plan, table, inside=False):
+    """Indexes read for ``table``, including the bitmap index scans under its bitmap heap scans."""
+    inside = inside or plan.get('Relation Name') == table
+    names = [plan['Index Name']] if inside and 'Index Name' in plan else []
+    for child in plan.get('Plans', []):
+        names.extend(index_names(child, table, inside))
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the queries behind every product listing filter, ordering and pagination combination, '
+        'and fail if any of them scans products_product, or pages through products_productstats, sequentially'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Products to add to a synthetic catalog first; rolled back at the end')
+        parser.add_argument('--categories', type=int, default=50, help='Categories in the synthetic catalog')
+        parser.add_argument('--show-plans', action='store_true', help='Print the plan of every failing query')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are only checked on PostgreSQL')
+
+        # Everything runs in one transaction that is rolled back at the end,
+        # so the synthetic catalog never reaches the real tables.
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'], options['categories'])
+            elif Product.objects.count() < 10000:
+                self.stdout.write(self.style.WARNING(
+                    '⚠️  Fewer than 10,000 products: the planner rightly prefers sequential scans on tables '
+                    'this small, pass --seed 200000 to check against a large catalog'
+                ))
+            failures = self.check_plans(options['show_plans'])
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{failures} listing queries scan the product tables sequentially')
+        self.stdout.write(self.style.SUCCESS('✅ Every listing query reads the product tables through indexes'))
+
+    def check_plans(self, show_plans):
+        categories = Category.objects.filter(is_active=True)
+        category = (
+            categories.filter(children__isnull=True).order_by('-active_product_count').values('pk', 'name').first()
+        )
+        if category is None:
+            raise CommandError('No categories to filter on, pass --seed')
+        department = categories.annotate(subcategories=Count('children')).order_by('-subcategories').first()
+        placeholders = {
+            'category': str(category['pk']), 'category_name': category['name'], 'department': str(department.pk),
+        }
+
+        failures = 0
+        self.stdout.write(f"{'filter':<20}{'ordering':<13}{'pagination':<13}indexes")
+        for filter_name, filter_params in FILTERS.items():
+            for ordering in ORDERINGS:
+                for pagination in PAGINATIONS:
+                    params = {name: value.format(**placeholders) for name, value in filter_params.items()}
+                    params['ordering'] = ordering
+                    bad, indexes = [], set()
+                    for sql in self.listing_queries(params, pagination):
+                        with connection.cursor() as cursor:
+                            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                            plan = cursor.fetchone()[0]
+                        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+                        indexes.update(name for table in TABLES for name in index_names(plan, table))
+                        scanned = TABLES[:1] if sql.startswith('SELECT COUNT(*)') else TABLES
+                        if any(sequential_scans(plan, table) for table in scanned):
+                            bad.append((sql, plan))
+                    line = f"{filter_name:<20}{ordering:<13}{pagination:<13}{', '.join(sorted(indexes)) or '-'}"
+                    if bad:
+                        failures += 1
+                        self.stdout.write(self.style.ERROR(f'{line}  ← sequential scan'))
+                        for sql, plan in bad if show_plans else []:
+                            self.stdout.write(f'    {sql}\n    {json.dumps(plan, indent=2)}')
+                    else:
+                        self.stdout.write(line)
+        return failures
+
+    def listing_queries(self, params, pagination):
+        """SQL the product list endpoint runs for ``params``, taken from the view's own code path."""
+        if pagination != 'page':
+            params['pagination'] = 'cursor'
+        if pagination == 'cursor-next':
+            view = self.list_view(params)
+            view.paginator.paginate_queryset(product_list_rows(view.filter_queryset(view.get_queryset())),
+                                             view.request, view)
+            next_link = view.paginator.keyset.get_next_link()
+            if next_link is None:
+                return []
+            params['cursor'] = parse_qs(urlsplit(next_link).query)['cursor'][0]
+
+        view = self.list_view(params)
+        rows = product_list_rows(view.filter_queryset(view.get_queryset()))
+        with CaptureQueriesContext(connection) as queries:
+            view.paginator.paginate_queryset(rows, view.request, view)
+        # The planner-estimate lookups behind page counts are EXPLAINs themselves
+        return [query['sql'] for query in queries.captured_queries if not query['sql'].startswith('EXPLAIN')]
+
+    def list_view(self, params):
+        # Any host ALLOWED_HOSTS accepts, so the paginator can build its next links
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host not in ('', '*')), 'localhost')
+        request = Request(APIRequestFactory().get('/api/products/products/', params, HTTP_HOST=host))
+        return ProductViewSet(action='list', request=request, format_kwarg=None, args=(), kwargs={})
+
+    def seed(self, product_count, category_count):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        # A two-level tree: products sit in the leaves, parent filters match whole subtrees
+        roots = []
+        for i in range(max(1, category_count // 5)):
+            pk = uuid.uuid4()
+            roots.append(Category(id=pk, path=Category.build_path(pk), name=f'Department {i}'))
+        Category.objects.bulk_create(roots)
+        categories = []
+        for i in range(max(1, category_count - len(roots))):
+            pk, parent = uuid.uuid4(), roots[i % len(roots)]
+            categories.append(Category(id=pk, parent=parent, path=Category.build_path(pk, parent.path),
+                                       name=f'Category {i}'))
+        Category.objects.bulk_create(categories)
+        batch, stats = [], []
+        for i in range(product_count):
+            price = rng.randint(5, 1000)
+            product = Product(
+                id=uuid.uuid4(),
+                name=' '.join(rng.sample(WORDS, 3)).title(),
+                description=' '.join(rng.choices(WORDS, k=30)),
+                price=price,
+                original_price=price + rng.randint(0, 200) if rng.random() < 0.3 else None,
+                category=rng.choice(categories),
+                is_active=rng.random() < 0.95,
+                is_featured=rng.random() < 0.02,
+                color=rng.choice(COLORS),
+                sku=f'EXPLAIN-{i}',
+            )
+            batch.append(product)
+            stats.append(ProductStats(
+                product=product,
+                stock_quantity=rng.choice([0, 0, 3, 10, 25, 100]),
+                # Products sold as variants often keep no stock of their own
+                variant_stock=rng.choice([0, 0, 0, 5, 40]),
+                rating=round(rng.uniform(0, 5), 2),
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                ProductStats.objects.bulk_create(stats)
+                batch, stats = [], []
+        Product.objects.bulk_create(batch)
+        ProductStats.objects.bulk_create(stats)
+        with connection.cursor() as cursor:
+            # auto_now_add stamps every row with the same moment; spread them over two years
+            cursor.execute(
+                "UPDATE products_product SET created_at = now() - random() * interval '730 days' "
+                "WHERE sku LIKE 'EXPLAIN-%%'"
+            )
+        seeded = Product.objects.filter(sku__startswith='EXPLAIN-')
+        update_search_vectors(seeded)
+        # bulk_create skips Product.save(), which stores the sale state
+        refresh_sale_state(seeded)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE products_product')
+            cursor.execute('ANALYZE products_productstats')
+            cursor.execute('ANALYZE products_category')
+        self.stdout.write(f'Seeded {product_count} products in {time.perf_counter() - started:.1f}s\n')
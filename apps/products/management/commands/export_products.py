@@ -0,0 +1,21 @@
+from apps.core.exports import ExportCommand
+from apps.products.exports import PRODUCT_EXPORT_COLUMNS, product_export_rows
+from apps.products.filters import ProductFilter
+
+
+class Command(ExportCommand):
+    help = 'Stream products with their category and variants to CSV or JSONL in constant memory'
+    filterset_class = ProductFilter
+    columns = PRODUCT_EXPORT_COLUMNS
+    name = 'products'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--filter', action='append', default=[], metavar='NAME=VALUE',
+                            help='ProductFilter parameter as on the listing, e.g. category_name=audio (repeatable)')
+
+    def filter_data(self, options):
+        return dict(item.split('=', 1) for item in options['filter'] if '=' in item)
+
+    def rows(self, queryset, chunk_size):
+        return product_export_rows(queryset, chunk_size)
@@ -0,0 +1,143 @@
+import json
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from apps.products.cache import bump_catalog_version, invalidate_tags
+from apps.products.denormalized import reconcile_category_counts
+from apps.products.importer import LOADERS, InvalidRecord, read_records, refresh_derived_data
+from apps.products.index_log import REBUILD
+from apps.products.search_index import INDEXED_PRODUCT_FIELDS, search_index_log
+from apps.products.suggest import SUGGESTED_PRODUCT_FIELDS, suggestion_index_log
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+# Rejected rows reported by reason, the rest are only counted
+REPORTED_ERRORS = 10
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or JSONL feed of categories, products, images or variants into the catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSONL file')
+        parser.add_argument('--kind', required=True, choices=sorted(LOADERS), help='Type of record in the file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Records written per transaction')
+        parser.add_argument('--checkpoint', help='Progress file, defaults to <path>.<kind>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        file_format = options['format'] or FORMATS.get(os.path.splitext(path)[1].lower())
+        if file_format is None:
+            raise CommandError('Cannot infer the format from the extension, pass --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        kind = options['kind']
+        checkpoint_path = options['checkpoint'] or f'{path}.{kind}.checkpoint'
+        progress = self.load_checkpoint(checkpoint_path, path, kind, options['restart'])
+        if progress['offset']:
+            self.stdout.write(f"↪️  Resuming after {progress['records']} records (byte {progress['offset']})")
+
+        loader = LOADERS[kind]()
+        self.errors = []
+        self.present = set()
+        started = time.perf_counter()
+        with open(path, 'rb') as handle:
+            chunk, offset = {}, progress['offset']
+            for record, offset in read_records(handle, file_format, progress['offset']):
+                progress['records'] += 1
+                try:
+                    if isinstance(record, InvalidRecord):
+                        raise record
+                    row = loader.clean(record)
+                except InvalidRecord as exc:
+                    self.reject(progress, f"record {progress['records']}: {exc}")
+                    continue
+                # The last occurrence of a key in a chunk wins, as it would row by row
+                chunk[loader.key(row)] = row
+                if len(chunk) == options['batch_size']:
+                    self.write_chunk(loader, chunk, offset, progress, checkpoint_path)
+                    chunk = {}
+            self.write_chunk(loader, chunk, offset, progress, checkpoint_path)
+
+        reconcile_category_counts()
+        bump_catalog_version()
+        invalidate_tags({'products', 'featured', 'categories'})
+        self.rebuild_indexes(kind)
+        os.remove(checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        for message in self.errors:
+            self.stdout.write(self.style.WARNING(f'⚠️  {message}'))
+        if kind == 'products' and not settings.PRODUCT_EMBEDDINGS_ON_SAVE:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  PRODUCT_EMBEDDINGS_ON_SAVE is off: run embed_products to refresh similar-product vectors'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {progress['written']} {kind} ({progress['rejected']} rejected) "
+            f"in {elapsed:.1f}s using {'COPY' if connection.vendor == 'postgresql' else 'bulk ORM'} writes"
+        ))
+
+    def write_chunk(self, loader, chunk, offset, progress, checkpoint_path):
+        """Write one chunk and record the file position after it in the same step."""
+        started = time.perf_counter()
+        rows = list(chunk.values())
+        written = 0
+        if rows:
+            present = set().union(*rows)
+            self.present |= present
+            with transaction.atomic():
+                written, rejected, product_ids = loader.load(rows, present)
+                if product_ids:
+                    refresh_derived_data(loader.kind, product_ids, present)
+            progress['written'] += written
+            if rejected:
+                self.reject(progress, f"{rejected} records up to record {progress['records']} reference unknown "
+                                      'products or lack the fields needed to create one', rejected)
+        progress['offset'] = offset
+        # Written after the commit: a crash in between replays the chunk, which
+        # the upserts make harmless
+        with open(checkpoint_path, 'w') as handle:
+            json.dump(progress, handle)
+        if rows:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {progress['records']:>10,} records read, {written:>6,} written "
+                f'({len(rows) / max(elapsed, 1e-9):,.0f} rows/s)'
+            )
+
+    def rebuild_indexes(self, kind):
+        """
+        Bulk writes skip the save signals that log single changes, so every
+        worker rebuilds its in-memory indexes in the background instead.
+        """
+        if kind == 'products' and self.present & set(INDEXED_PRODUCT_FIELDS):
+            search_index_log.append(REBUILD)
+        # sku is the match key of every product feed, it never changes an existing product
+        if kind == 'categories' or kind == 'products' and self.present & set(SUGGESTED_PRODUCT_FIELDS) - {'sku'}:
+            suggestion_index_log.append(REBUILD)
+
+    def reject(self, progress, reason, count=1):
+        progress['rejected'] += count
+        if len(self.errors) < REPORTED_ERRORS:
+            self.errors.append(reason)
+
+    def load_checkpoint(self, checkpoint_path, path, kind, restart):
+        fresh = {
+            'path': os.path.abspath(path), 'kind': kind, 'size': os.path.getsize(path),
+            'offset': 0, 'records': 0, 'written': 0, 'rejected': 0,
+        }
+        if restart or not os.path.exists(checkpoint_path):
+            return fresh
+        with open(checkpoint_path) as handle:
+            saved = json.load(handle)
+        if (saved.get('path'), saved.get('kind'), saved.get('size')) != (fresh['path'], kind, fresh['size']):
+            raise CommandError(
+                f'{checkpoint_path} belongs to another file or the file changed, pass --restart to start over'
+            )
+        return saved
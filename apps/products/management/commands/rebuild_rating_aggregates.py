@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.products.denormalized import rebuild_review_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recompute product ratings, review counts and star histograms from the reviews table'
+
+    def handle(self, *args, **options):
+        updated = rebuild_review_aggregates()
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt rating aggregates for {updated} products'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from apps.products.models import Product
+from apps.products.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the full-text search document of every product (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of products updated per statement')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('⚠️  Full-text search vectors require PostgreSQL, nothing to do'))
+            return
+
+        batch_size = options['batch_size']
+        ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        total = 0
+        for start in range(0, len(ids), batch_size):
+            total += update_search_vectors(Product.objects.filter(pk__in=ids[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt search vectors for {total} products'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.products.denormalized import rebuild_variant_stock
+
+
+class Command(BaseCommand):
+    help = 'Recompute each product\'s active variant stock rollup from the variants table'
+
+    def handle(self, *args, **options):
+        updated = rebuild_variant_stock()
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt variant stock for {updated} products'))
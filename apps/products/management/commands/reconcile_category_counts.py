@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.products.denormalized import reconcile_category_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount active products per category and repair drifted counters'
+
+    def handle(self, *args, **options):
+        drifted = reconcile_category_counts()
+        if drifted:
+            self.stdout.write(self.style.WARNING(f'⚠️  Fixed {drifted} drifted category counters'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ All category counters are accurate'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pgvector.django
+import pgvector.django.indexes
+import pgvector.django.vector
+from apps.core.operations import PostgresOnly
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_co_purchase'),
+    ]
+
+    operations = [
+        # CREATE EXTENSION IF NOT EXISTS vector; skipped on other vendors
+        pgvector.django.VectorExtension(),
+        migrations.CreateModel(
+            name='ProductEmbedding',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='embedding', serialize=False, to='products.product')),
+                ('embedding', pgvector.django.vector.VectorField(dimensions=256)),
+                ('provider', models.CharField(max_length=100)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        PostgresOnly(migrations.AddIndex(
+            model_name='productembedding',
+            index=pgvector.django.indexes.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='product_embedding_hnsw', opclasses=['vector_cosine_ops']),
+        )),
+    ]
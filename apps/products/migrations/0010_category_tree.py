@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_paths(apps, schema_editor):
+    # Every existing category is a root
+    Category = apps.get_model('products', 'Category')
+    for category in Category.objects.only('pk').iterator():
+        Category.objects.filter(pk=category.pk).update(path=f'/{category.pk.hex}/')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='products.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_variant_stock(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    Product.objects.update(variant_stock=Coalesce(
+        Subquery(
+            ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True)
+            .order_by()
+            .values('product')
+            .annotate(total=Sum('stock_quantity'))
+            .values('total')
+        ),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_category_tree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='variant_stock',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_variant_stock, migrations.RunPython.noop),
+    ]
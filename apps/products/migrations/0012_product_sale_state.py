@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:44
+
+from django.db import migrations, models
+from django.db.models import BooleanField, Case, F, IntegerField, Value, When
+from django.db.models.functions import Cast, Floor
+from apps.core.operations import AddIndexConcurrentlyIfSupported
+
+
+def populate_sale_state(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Product.objects.update(
+        is_on_sale=Case(When(original_price__gt=F('price'), then=Value(True)), default=Value(False),
+                        output_field=BooleanField()),
+        discount_percentage=Case(
+            When(original_price__gt=F('price'), then=Cast(
+                Floor((F('original_price') - F('price')) * 100 / F('original_price')), IntegerField(),
+            )),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('products', '0011_product_variant_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='discount_percentage',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_on_sale',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(populate_sale_state, migrations.RunPython.noop, atomic=True),
+        AddIndexConcurrentlyIfSupported(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['discount_percentage', 'id'], name='product_active_discount_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'discount_percentage', 'id'], name='product_active_cat_disc_idx'),
+        ),
+        AddIndexConcurrentlyIfSupported(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_on_sale', True)), fields=['created_at', 'id'], name='product_on_sale_created_idx'),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:58
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+STATS_COLUMNS = [
+    'stock_quantity', 'variant_stock', 'rating', 'review_count', 'rating_sum',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+]
+
+
+def copy_counters_to_stats(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductStats = apps.get_model('products', 'ProductStats')
+    quote = schema_editor.quote_name
+    columns = ', '.join(quote(column) for column in STATS_COLUMNS)
+    # One INSERT ... SELECT rather than a round trip per product
+    schema_editor.execute(
+        f'INSERT INTO {quote(ProductStats._meta.db_table)} ({quote("product_id")}, {columns}) '
+        f'SELECT {quote("id")}, {columns} FROM {quote(Product._meta.db_table)}'
+    )
+
+
+def copy_counters_to_products(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductStats = apps.get_model('products', 'ProductStats')
+    Product.objects.update(**{
+        column: Subquery(ProductStats.objects.filter(product=OuterRef('pk')).values(column)[:1])
+        for column in STATS_COLUMNS
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_sale_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='products.product')),
+                ('stock_quantity', models.PositiveIntegerField(default=0)),
+                ('variant_stock', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating', models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=3)),
+                ('review_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating_sum', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating_1_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating_2_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating_3_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating_4_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('rating_5_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'verbose_name_plural': 'Product stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productstats',
+            index=models.Index(fields=['rating', 'product'], name='productstats_rating_idx'),
+        ),
+        migrations.RunPython(copy_counters_to_stats, copy_counters_to_products),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_rating_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_cat_rating_idx',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating_1_count',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating_2_count',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating_3_count',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating_4_count',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating_5_count',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='rating_sum',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='review_count',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='stock_quantity',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='variant_stock',
+        ),
+    ]
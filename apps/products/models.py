@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Max, Q
+from django.db.models.functions import Length, Upper
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from pgvector.django import HnswIndex, VectorField
 import uuid
+from decimal import ROUND_HALF_UP, Decimal
 
 User = get_user_model()
 
@@ -9,15 +17,55 @@ class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='children', blank=True, null=True)
+    # Materialized path '/<root id>/.../<own id>/' of UUID hex segments: a
+    # category's subtree is every category whose path starts with its own
+    path = models.CharField(max_length=255, editable=False, default='')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Number of active products, kept in sync by apps.products.signals
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            # Pattern ops let PostgreSQL answer path LIKE 'prefix%' from the index
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
     
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def build_path(pk, parent_path=None):
+        return f"{parent_path or '/'}{pk.hex}/"
+
+    @property
+    def depth(self):
+        return self.path.count('/') - 2
+
+    def clean(self):
+        super().clean()
+        if self.parent_id is None:
+            return
+        if self.path and self.parent.path.startswith(self.path):
+            raise ValidationError({'parent': 'A category cannot be moved under itself or its subcategories.'})
+        new_path = self.build_path(self.pk, self.parent.path)
+        deepest = len(new_path)
+        if self.path:
+            subtree = Category.objects.filter(path__startswith=self.path).aggregate(longest=Max(Length('path')))
+            deepest += (subtree['longest'] or len(self.path)) - len(self.path)
+        if deepest > self._meta.get_field('path').max_length:
+            raise ValidationError({'parent': 'Categories cannot be nested this deep.'})
+
+    def save(self, *args, **kwargs):
+        # Descendants follow a moved category in apps.products.signals
+        self.path = self.build_path(self.pk, self.parent.path if self.parent_id else None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'path'}
+        super().save(*args, **kwargs)
+
 class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=200)
@@ -27,29 +75,117 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
-    stock_quantity = models.PositiveIntegerField(default=0)
     sku = models.CharField(max_length=100, unique=True)
-    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
-    review_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     color = models.CharField(max_length=50, blank=True, null=True)
+    # Path of the primary ProductImage, kept in sync by apps.products.signals
+    primary_image = models.CharField(max_length=100, blank=True, editable=False)
+    # Weighted name/category/description document, see apps.products.search
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Derived from price and original_price on save, stored so deals filter and sort in SQL
+    discount_percentage = models.PositiveSmallIntegerField(default=0, editable=False)
+    is_on_sale = models.BooleanField(default=False, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            # Listings only show active products; each index serves one ordering in both
+            # directions, with id as the tie-break KeysetPagination appends
+            models.Index(fields=['created_at', 'id'], condition=Q(is_active=True), name='product_active_created_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True), name='product_active_price_idx'),
+            models.Index(
+                fields=['category', 'created_at', 'id'], condition=Q(is_active=True),
+                name='product_active_cat_created_idx',
+            ),
+            models.Index(
+                fields=['category', 'price', 'id'], condition=Q(is_active=True), name='product_active_cat_price_idx',
+            ),
+            models.Index(
+                fields=['created_at', 'id'], condition=Q(is_active=True, is_featured=True),
+                name='product_featured_created_idx',
+            ),
+            # ?color= is an iexact match, compiled to UPPER(color) = UPPER(%s)
+            models.Index(Upper('color'), condition=Q(is_active=True), name='product_active_color_idx'),
+            # ?ordering=discount and ?discount_min=, and the newest deals for ?on_sale=
+            models.Index(fields=['discount_percentage', 'id'], condition=Q(is_active=True),
+                         name='product_active_discount_idx'),
+            models.Index(
+                fields=['category', 'discount_percentage', 'id'], condition=Q(is_active=True),
+                name='product_active_cat_disc_idx',
+            ),
+            models.Index(
+                fields=['created_at', 'id'], condition=Q(is_active=True, is_on_sale=True),
+                name='product_on_sale_created_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.name
-    
-    @property
-    def discount_percentage(self):
-        if self.original_price and self.original_price > self.price:
-            return int(((self.original_price - self.price) / self.original_price) * 100)
-        return 0
-    
+
+    def save(self, *args, **kwargs):
+        self.apply_sale_state()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'original_price'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'discount_percentage', 'is_on_sale'}
+        super().save(*args, **kwargs)
+
+    def apply_sale_state(self):
+        """Set is_on_sale and discount_percentage from the current prices."""
+        price, original_price = self._stored_decimal('price'), self._stored_decimal('original_price')
+        # Same arithmetic as apps.products.denormalized.discount_percentage_expression
+        self.is_on_sale = bool(original_price and price is not None and original_price > price)
+        self.discount_percentage = int((original_price - price) * 100 / original_price) if self.is_on_sale else 0
+
+    def _stored_decimal(self, name):
+        field = self._meta.get_field(name)
+        value = field.to_python(getattr(self, name))
+        # Rounded to the column's scale the way PostgreSQL rounds numeric input
+        return None if value is None else value.quantize(Decimal(1).scaleb(-field.decimal_places), ROUND_HALF_UP)
+
+class ProductStats(models.Model):
+    """
+    The volatile counters of a product, one row per product. Reviews and stock
+    movements change them with targeted UPDATE ... SET x = x + n statements
+    (see apps.products.denormalized), so the wide Product row, its indexes and
+    updated_at only change when merchandising data does. New counters, such as
+    views or sales, belong here rather than on Product.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    stock_quantity = models.PositiveIntegerField(default=0)
+    # Total stock of the active variants, kept by apps.products.signals
+    variant_stock = models.PositiveIntegerField(default=0, editable=False)
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    # Running review aggregates behind rating/review_count, kept by apps.products.signals
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name_plural = 'Product stats'
+        indexes = [
+            # ?ordering=rating walks this and joins each product by primary key
+            models.Index(fields=['rating', 'product'], name='productstats_rating_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats of {self.product_id}"
+
     @property
     def is_in_stock(self):
-        return self.stock_quantity > 0
+        return self.stock_quantity > 0 or self.variant_stock > 0
+
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
+# Sellable as is or through any active variant; the SQL counterpart of ProductStats.is_in_stock
+IN_STOCK = Q(stats__stock_quantity__gt=0) | Q(stats__variant_stock__gt=0)
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
@@ -113,3 +249,42 @@ class Wishlist(models.Model):
     
     def __str__(self):
         return f"{self.user.email} - {self.product.name}"
+
+class ProductCoPurchase(models.Model):
+    """Top-k "frequently bought together" neighbours of a product, rebuilt by build_co_purchases"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='co_purchases')
+    neighbor = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='co_purchased_with')
+    rank = models.PositiveSmallIntegerField()
+    # Cosine similarity of the two products' order vectors
+    score = models.FloatField()
+    # Orders containing both products
+    orders = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='product_co_purchase_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+
+class ProductEmbedding(models.Model):
+    """Vector of an active product's text behind "similar products", kept current by apps.products.similarity"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='embedding')
+    embedding = VectorField(dimensions=settings.PRODUCT_EMBEDDING_DIMENSIONS)
+    # Provider that produced the vector, and digest of the provider + text it was given
+    provider = models.CharField(max_length=100)
+    content_hash = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            HnswIndex(
+                fields=['embedding'], name='product_embedding_hnsw',
+                m=16, ef_construction=64, opclasses=['vector_cosine_ops'],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} ({self.provider})"
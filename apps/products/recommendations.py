@@ -0,0 +1,256 @@
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .cache import invalidate_tags
+from .models import Product, ProductCoPurchase
+
+# Orders that never completed do not say anything about what sells together
+EXCLUDED_ORDER_STATUSES = ('cancelled', 'refunded')
+
+
+@dataclass
+class CoPurchaseCounts:
+    """
+    Sparse, symmetric item-item co-occurrence matrix over ``product_ids``.
+    Pair (a, b) with a < b is stored once as the code a * len(product_ids) + b;
+    ``item_orders[a]`` is the diagonal, the number of orders containing a.
+    """
+    product_ids: np.ndarray
+    item_orders: np.ndarray
+    pair_codes: np.ndarray
+    pair_orders: np.ndarray
+    # Orders created up to this moment are counted
+    watermark: object = None
+
+    @property
+    def size(self):
+        return len(self.product_ids)
+
+    def pairs(self):
+        return np.divmod(self.pair_codes, max(self.size, 1))
+
+    def reindexed(self, product_ids):
+        """The same counts over ``product_ids``, a superset of the current ids in any order."""
+        position = {product_id: index for index, product_id in enumerate(product_ids)}
+        mapping = np.array([position[product_id] for product_id in self.product_ids], dtype=np.int64)
+        item_orders = np.zeros(len(product_ids), np.int64)
+        item_orders[mapping] = self.item_orders
+        a, b = self.pairs()
+        a, b = mapping[a], mapping[b]
+        return CoPurchaseCounts(
+            np.asarray(product_ids), item_orders, np.minimum(a, b) * len(product_ids) + np.maximum(a, b),
+            self.pair_orders, self.watermark,
+        )
+
+    def merged(self, other):
+        """Element-wise sum of two count matrices; the result carries ``other``'s watermark."""
+        known = set(self.product_ids)
+        new_ids = [product_id for product_id in other.product_ids if product_id not in known]
+        product_ids = np.concatenate([self.product_ids, np.asarray(new_ids, dtype=self.product_ids.dtype)])
+        left, right = self.reindexed(product_ids), other.reindexed(product_ids)
+        codes, inverse = np.unique(np.concatenate([left.pair_codes, right.pair_codes]), return_inverse=True)
+        pair_orders = np.bincount(inverse, weights=np.concatenate([left.pair_orders, right.pair_orders]))
+        return CoPurchaseCounts(
+            product_ids, left.item_orders + right.item_orders, codes, pair_orders.astype(np.int64), other.watermark,
+        )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Written aside and renamed, so a crash never leaves a truncated state file
+        temporary = f'{path}.tmp.npz'
+        np.savez_compressed(
+            temporary, product_ids=self.product_ids, item_orders=self.item_orders,
+            pair_codes=self.pair_codes, pair_orders=self.pair_orders,
+            watermark=np.array([self.watermark.isoformat() if self.watermark else '']),
+        )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            watermark = str(data['watermark'][0])
+            return cls(
+                data['product_ids'], data['item_orders'], data['pair_codes'], data['pair_orders'],
+                datetime.fromisoformat(watermark) if watermark else None,
+            )
+
+
+def order_lines(since=None, until=None, chunk_size=None):
+    """(order, product) index arrays of order lines, plus the product ids behind the product indices."""
+    from apps.orders.models import OrderItem
+
+    lines = OrderItem.objects.exclude(order__status__in=EXCLUDED_ORDER_STATUSES)
+    if since is not None:
+        lines = lines.filter(order__created_at__gt=since)
+    if until is not None:
+        lines = lines.filter(order__created_at__lte=until)
+    product_index = {}
+    orders, products = [], []
+    order_index, previous_order = -1, None
+    rows = lines.order_by('order_id').values_list('order_id', 'product_id')
+    for order_id, product_id in rows.iterator(chunk_size=chunk_size or settings.STREAMING_CHUNK_SIZE):
+        if order_id != previous_order:
+            order_index += 1
+            previous_order = order_id
+        orders.append(order_index)
+        products.append(product_index.setdefault(str(product_id), len(product_index)))
+    return (
+        np.asarray(orders, dtype=np.int64), np.asarray(products, dtype=np.int64),
+        np.asarray(list(product_index), dtype='U36'),
+    )
+
+
+def count_co_purchases(orders, products, product_ids, max_basket=None):
+    """
+    Co-occurrence counts of order lines sorted by order. Pairs are produced
+    vectorized, one pass per position offset within a basket, so the Python
+    loop runs (largest basket) times rather than once per pair.
+    """
+    size = len(product_ids)
+    if not len(orders):
+        return CoPurchaseCounts(product_ids, np.zeros(size, np.int64), np.zeros(0, np.int64), np.zeros(0, np.int64))
+
+    # An order listing the same product twice still counts once
+    lines = np.unique(orders * size + products)
+    orders, products = np.divmod(lines, size)
+    item_orders = np.bincount(products, minlength=size).astype(np.int64)
+
+    # Lines left in the basket after each line; only the first max_basket lines are paired
+    max_basket = max_basket or settings.CO_PURCHASE_MAX_BASKET
+    starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+    basket_sizes = np.diff(np.r_[starts, len(orders)])
+    positions = np.arange(len(orders)) - np.repeat(starts, basket_sizes)
+    remaining = np.minimum(np.repeat(basket_sizes, basket_sizes), max_basket) - positions - 1
+
+    codes = []
+    candidates = np.flatnonzero(remaining > 0)
+    offset = 1
+    while len(candidates):
+        # Each pass pairs every line with the line ``offset`` further in its basket,
+        # over a shrinking set of lines whose basket is still long enough
+        a, b = products[candidates], products[candidates + offset]
+        codes.append(np.minimum(a, b) * size + np.maximum(a, b))
+        offset += 1
+        candidates = candidates[remaining[candidates] >= offset]
+    codes, pair_orders = np.unique(np.concatenate(codes) if codes else np.zeros(0, np.int64), return_counts=True)
+    return CoPurchaseCounts(product_ids, item_orders, codes, pair_orders.astype(np.int64))
+
+
+def top_neighbors(counts, k=None, min_orders=None):
+    """
+    Each product's ``k`` most similar products by cosine similarity,
+    orders(a and b) / sqrt(orders(a) * orders(b)), over pairs bought together
+    in at least ``min_orders`` orders. Returns parallel arrays
+    (product, neighbor, rank, score, orders), sorted by product then rank.
+    """
+    k = k or settings.CO_PURCHASE_TOP_K
+    min_orders = min_orders or settings.CO_PURCHASE_MIN_ORDERS
+    keep = counts.pair_orders >= min_orders
+    a, b = counts.pairs()
+    a, b, together = a[keep], b[keep], counts.pair_orders[keep]
+    score = together / np.sqrt(counts.item_orders[a] * counts.item_orders[b])
+
+    # Both directions of every pair, then rank within each product by score
+    source, target = np.concatenate([a, b]), np.concatenate([b, a])
+    score, together = np.concatenate([score, score]), np.concatenate([together, together])
+    order = np.lexsort((target, -score, source))
+    source, target, score, together = source[order], target[order], score[order], together[order]
+    starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]]) if len(source) else np.zeros(0, np.int64)
+    rank = np.arange(len(source)) - np.repeat(starts, np.diff(np.r_[starts, len(source)]))
+    top = rank < k
+    return source[top], target[top], rank[top], score[top], together[top]
+
+
+def affected_products(counts, changed):
+    """
+    Indices whose neighbour scores depend on the products in ``changed``: the
+    products themselves and everything ever bought with them, since their
+    order counts appear in those products' similarity denominators.
+    """
+    a, b = counts.pairs()
+    mask = np.zeros(counts.size, bool)
+    mask[changed] = True
+    touched = mask[a] | mask[b]
+    mask[a[touched]] = True
+    mask[b[touched]] = True
+    return np.flatnonzero(mask)
+
+
+def write_neighbors(counts, neighbors, products=None, batch_size=5000):
+    """
+    Replace the stored neighbours of ``products`` (indices; all when None)
+    in one transaction, so readers see either the old or the new lists.
+    """
+    source, target, rank, score, together = neighbors
+    if products is not None:
+        selected = np.isin(source, products)
+        source, target, rank, score, together = (
+            source[selected], target[selected], rank[selected], score[selected], together[selected]
+        )
+    # Products deleted since their orders were counted are skipped
+    existing = set(map(str, Product.objects.values_list('pk', flat=True).iterator()))
+    valid = np.array([product_id in existing for product_id in counts.product_ids], bool)
+    keep = valid[source] & valid[target]
+
+    rows = (
+        ProductCoPurchase(
+            product_id=uuid.UUID(counts.product_ids[s]), neighbor_id=uuid.UUID(counts.product_ids[t]),
+            rank=int(r), score=float(sc), orders=int(o),
+        )
+        for s, t, r, sc, o in zip(source[keep], target[keep], rank[keep], score[keep], together[keep])
+    )
+    with transaction.atomic():
+        stale = ProductCoPurchase.objects.all()
+        if products is not None:
+            ids = [uuid.UUID(counts.product_ids[index]) for index in products]
+            for start in range(0, len(ids), batch_size):
+                stale.filter(product_id__in=ids[start:start + batch_size]).delete()
+        else:
+            stale.delete()
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                written += len(ProductCoPurchase.objects.bulk_create(batch))
+                batch = []
+        written += len(ProductCoPurchase.objects.bulk_create(batch))
+        transaction.on_commit(lambda: invalidate_tags({'recommendations'}))
+    return written
+
+
+def build_co_purchases(full=False, state_file=None, chunk_size=None):
+    """
+    Count order lines into the saved co-occurrence matrix and refresh the
+    stored neighbours. Incremental runs only read orders created since the
+    previous run's watermark and rewrite the products whose scores moved;
+    ``full`` (or a missing state file) recounts every order.
+    Returns (counts, order lines read, products rewritten, rows written).
+    """
+    state_file = state_file or settings.CO_PURCHASE_STATE_FILE
+    previous = None if full or not os.path.exists(state_file) else CoPurchaseCounts.load(state_file)
+    # Orders still committing around "now" are left to the next run
+    until = timezone.now() - settings.CO_PURCHASE_SETTLE_TIME
+    since = previous.watermark if previous else None
+
+    orders, products, product_ids = order_lines(since, until, chunk_size)
+    delta = count_co_purchases(orders, products, product_ids)
+    delta.watermark = until
+    counts = previous.merged(delta) if previous else delta
+
+    neighbors = top_neighbors(counts)
+    if previous is None:
+        rewritten, written = counts.size, write_neighbors(counts, neighbors)
+    else:
+        position = {product_id: index for index, product_id in enumerate(counts.product_ids)}
+        changed = np.array([position[product_id] for product_id in delta.product_ids], dtype=np.int64)
+        affected = affected_products(counts, changed)
+        rewritten, written = len(affected), write_neighbors(counts, neighbors, affected) if len(affected) else 0
+    # Saved last: if anything above fails, the next run recounts the same orders
+    counts.save(state_file)
+    return counts, len(orders), rewritten, written
@@ -0,0 +1,97 @@
+import re
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, DecimalField, F, IntegerField, OuterRef, Q, Subquery, When
+from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
+from .models import Category, Product
+
+SEARCH_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class IContainsSearchBackend:
+    """Substring match over name, description and category name (sequential scan)."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query)
+        ).distinct()
+
+
+class PostgresSearchBackend:
+    """
+    Full-text search over Product.search_vector (GIN indexed). Every term is
+    matched as a prefix, so partial words typed into the search box still hit,
+    and results are ranked by weighted relevance (name > category > description).
+    Falls back to substring matching on other database vendors.
+    """
+
+    fallback = IContainsSearchBackend
+    # ts_rank() returns a float4, which does not survive the round trip through a
+    # keyset cursor; ranks are compared and sorted as rounded numerics instead
+    rank_field = DecimalField(max_digits=12, decimal_places=8)
+
+    def search(self, queryset, query):
+        if connection.vendor != 'postgresql':
+            return self.fallback().search(queryset, query)
+
+        terms = SEARCH_TERM_RE.findall(query.lower())
+        if not terms:
+            return queryset.none()
+
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            search_type='raw',
+            config=settings.PRODUCT_SEARCH_CONFIG,
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(search_rank=Cast(SearchRank(F('search_vector'), search_query), self.rank_field))
+            .order_by('-search_rank', '-created_at')
+        )
+
+
+class InMemorySearchBackend:
+    """
+    Typo-tolerant search served from the in-process inverted index in
+    apps.products.search_index. Candidates and their ranking come from memory;
+    the database is only asked to load the matched rows.
+    """
+
+    def search(self, queryset, query):
+        from .search_index import get_search_index
+
+        product_ids = get_search_index().search(query, limit=settings.PRODUCT_SEARCH_INDEX_MAX_RESULTS)
+        if not product_ids:
+            return queryset.none()
+
+        rank = Case(
+            *[When(pk=pk, then=len(product_ids) - position) for position, pk in enumerate(product_ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=product_ids).annotate(search_rank=rank).order_by('-search_rank')
+
+
+def get_search_backend():
+    return import_string(settings.PRODUCT_SEARCH_BACKEND)()
+
+
+def product_search_vector():
+    config = settings.PRODUCT_SEARCH_CONFIG
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=config) +
+        SearchVector(category_name, weight='B', config=config) +
+        SearchVector('description', weight='C', config=config)
+    )
+
+
+def update_search_vectors(queryset=None):
+    """Recompute search_vector for ``queryset`` (all products by default) in one UPDATE."""
+    if connection.vendor != 'postgresql':
+        return 0
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.update(search_vector=product_search_vector())
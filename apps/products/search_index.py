@@ -0,0 +1,277 @@
+import bisect
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import DatabaseError
+from .index_log import ChangeLog, IndexReplica
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SEARCH_INDEX_TAG = 'search-index'
+# Product fields the index reads; saves touching none of them leave it alone
+INDEXED_PRODUCT_FIELDS = ['category_id', 'name', 'description', 'is_active']
+
+# Field weights used to rank matches; a token keeps its best field
+FIELD_WEIGHTS = {'name': 3.0, 'category': 2.0, 'description': 1.0}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if len(token) > 1]
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    In-process inverted index over active product names, category names and
+    descriptions. Terms resolve to exact tokens first, then to vocabulary
+    prefixes and finally to trigram-similar tokens, so typos such as
+    "wireles headphnes" still find results without touching the database.
+    """
+
+    def __init__(self, min_similarity=0.45, max_candidates=400):
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}                      # token -> {field weight: {product_id, ...}}
+        self.trigram_tokens = defaultdict(set)  # trigram -> tokens
+        self.documents = {}                     # product_id -> (category_id, {token: weight})
+        self.category_names = {}                # category_id -> name
+        self.category_members = defaultdict(set)
+        self._sorted_vocabulary = []
+        self._vocabulary_dirty = False
+        self._expansions = {}
+        self.is_built = False
+        self.version = None
+
+    # Building and incremental updates
+
+    def build(self, version=None):
+        rows = (
+            Product.objects.filter(is_active=True)
+            .values_list('pk', 'name', 'description', 'category_id', 'category__name')
+            .iterator(chunk_size=5000)
+        )
+        with self._lock:
+            self._reset()
+            for product_id, name, description, category_id, category_name in rows:
+                self.category_names[category_id] = category_name
+                self._add(product_id, name, description, category_id)
+            self.is_built = True
+            self.version = version
+
+    def _add(self, product_id, name, description, category_id):
+        weights = {}
+        for field, text in (
+            ('description', description),
+            ('category', self.category_names.get(category_id)),
+            ('name', name),
+        ):
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0), FIELD_WEIGHTS[field])
+
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                for gram in trigrams(token):
+                    self.trigram_tokens[gram].add(token)
+                self._vocabulary_dirty = True
+            self.postings[token].setdefault(weight, set()).add(product_id)
+        self.documents[product_id] = (category_id, weights)
+        self.category_members[category_id].add(product_id)
+        self._expansions.clear()
+
+    def _remove(self, product_id):
+        document = self.documents.pop(product_id, None)
+        if document is None:
+            return
+        category_id, weights = document
+        self.category_members[category_id].discard(product_id)
+        for token, weight in weights.items():
+            tiers = self.postings.get(token)
+            if tiers is None:
+                continue
+            tiers.get(weight, set()).discard(product_id)
+            if not tiers.get(weight, True):
+                del tiers[weight]
+            if not tiers:
+                del self.postings[token]
+                for gram in trigrams(token):
+                    self.trigram_tokens[gram].discard(token)
+                self._vocabulary_dirty = True
+        self._expansions.clear()
+
+    def replay(self, entries):
+        """Apply ChangeLog entries in place, reloading the rows they name."""
+        product_ids = {pk for kind, pk in entries if kind == 'product'}
+        category_ids = {pk for kind, pk in entries if kind == 'category'}
+        for category_id, name in Category.objects.filter(pk__in=category_ids).values_list('pk', 'name'):
+            self.rename_category(category_id, name)
+        rows = {
+            row[0]: row for row in Product.objects.filter(pk__in=product_ids, is_active=True)
+            .values_list('pk', 'name', 'description', 'category_id', 'category__name')
+        }
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+                if product_id in rows:
+                    _, name, description, category_id, category_name = rows[product_id]
+                    self.category_names[category_id] = category_name
+                    self._add(product_id, name, description, category_id)
+
+    def rename_category(self, category_id, name):
+        with self._lock:
+            self.category_names[category_id] = name
+            for product_id in list(self.category_members.get(category_id, ())):
+                self._remove(product_id)
+            # The index keeps tokens only, so member texts are reloaded to re-tokenize them
+            members = (
+                Product.objects.filter(category_id=category_id, is_active=True)
+                .values_list('pk', 'name', 'description', 'category_id')
+            )
+            for row in members:
+                self._add(*row)
+
+    # Querying
+
+    def _vocabulary(self):
+        if self._vocabulary_dirty:
+            self._sorted_vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        return self._sorted_vocabulary
+
+    def expand(self, term):
+        """Return [(token, similarity)] for the vocabulary tokens ``term`` may refer to."""
+        cached = self._expansions.get(term)
+        if cached is not None:
+            return cached
+
+        if term in self.postings:
+            expansions = [(term, 1.0)]
+        else:
+            expansions = {}
+            vocabulary = self._vocabulary()
+            start = bisect.bisect_left(vocabulary, term)
+            for token in vocabulary[start:start + 50]:
+                if not token.startswith(term):
+                    break
+                expansions[token] = 0.9
+
+            term_grams = trigrams(term)
+            shared = Counter()
+            for gram in term_grams:
+                shared.update(self.trigram_tokens.get(gram, ()))
+            for token, count in shared.items():
+                # Dice coefficient over the padded trigram sets
+                similarity = 2 * count / (len(term_grams) + len(token) + 1)
+                if similarity >= self.min_similarity and similarity > expansions.get(token, 0):
+                    expansions[token] = similarity
+            expansions = sorted(expansions.items(), key=lambda item: -item[1])[:20]
+
+        self._expansions[term] = expansions
+        return expansions
+
+    def _weight(self, token, product_id):
+        for weight, product_ids in self.postings[token].items():
+            if product_id in product_ids:
+                return weight
+        return 0.0
+
+    def _term_score(self, expansions, product_id):
+        best = 0.0
+        for token, similarity in expansions:
+            score = self._weight(token, product_id) * similarity
+            if score > best:
+                best = score
+        return best
+
+    def search(self, query, limit=200):
+        """Return up to ``limit`` product ids, best match first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            per_term = []
+            for term in dict.fromkeys(terms):
+                expansions = self.expand(term)
+                if not expansions:
+                    return []
+                per_term.append(expansions)
+
+            # Drive the scan from the most selective term and visit its postings
+            # best tier first, so the walk can stop after max_candidates matches.
+            per_term.sort(key=lambda expansions: sum(
+                len(product_ids) for token, _ in expansions for product_ids in self.postings[token].values()
+            ))
+            driver, others = per_term[0], per_term[1:]
+            sources = sorted(
+                ((weight * similarity, product_ids)
+                 for token, similarity in driver
+                 for weight, product_ids in self.postings[token].items()),
+                key=lambda source: -source[0],
+            )
+            scores = self._collect(sources, others)
+
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def _collect(self, sources, others):
+        scores = {}
+        seen = set()
+        for driver_score, product_ids in sources:
+            for product_id in product_ids:
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                total = driver_score
+                for expansions in others:
+                    score = self._term_score(expansions, product_id)
+                    if not score:
+                        break
+                    total += score
+                else:
+                    scores[product_id] = total
+                    if len(scores) >= self.max_candidates:
+                        return scores
+        return scores
+
+
+search_index_log = ChangeLog(SEARCH_INDEX_TAG)
+_replica = IndexReplica(
+    lambda: ProductSearchIndex(
+        min_similarity=settings.PRODUCT_SEARCH_INDEX_MIN_SIMILARITY,
+        max_candidates=settings.PRODUCT_SEARCH_INDEX_MAX_CANDIDATES,
+    ),
+    search_index_log,
+)
+
+
+def get_search_index():
+    """The process-wide index, built from the database on first use and kept current from its log."""
+    return _replica.get()
+
+
+def uses_search_index():
+    return settings.PRODUCT_SEARCH_BACKEND == 'apps.products.search.InMemorySearchBackend'
+
+
+def warm_search_index():
+    """Build the index at worker start when the in-memory backend is selected."""
+    if not uses_search_index():
+        return
+    try:
+        get_search_index()
+    except DatabaseError:
+        # The first search request retries the build
+        logger.exception('Could not build the product search index at startup')
@@ -1,22 +1,84 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
+from apps.core.images import ImageSrcsetField, srcset
 from .models import Category, Product, ProductImage, ProductVariant, ProductReview, Wishlist
 
 
+def load_wishlist_state(context, product_ids):
+    """
+    Resolve the wishlist flag for ``product_ids`` in one query and cache it on
+    the serializer context, so every serializer sharing that context reuses it.
+    """
+    state = context.setdefault('wishlist_state', {})
+    missing = [pk for pk in product_ids if pk not in state]
+    if not missing:
+        return state
+
+    # Payloads shared across users (cached responses) leave the flag unset
+    request = context.get('request')
+    if context.get('shared_payload') or getattr(request, 'shared_payload', False):
+        request = None
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        state.update(dict.fromkeys(missing, False))
+        return state
+
+    wishlisted = set(
+        Wishlist.objects.filter(user=user, product_id__in=missing).values_list('product_id', flat=True)
+    )
+    state.update({pk: pk in wishlisted for pk in missing})
+    return state
+
+
+def is_wishlisted(context, product_id):
+    return load_wishlist_state(context, [product_id])[product_id]
+
+
+def apply_wishlist_overlay(items, request, field='is_wishlisted'):
+    """Set the wishlist flag on already serialized products for the requesting user."""
+    if not items or not request.user.is_authenticated:
+        return items
+    wishlisted = {
+        str(pk) for pk in Wishlist.objects.filter(
+            user=request.user, product_id__in=[item['id'] for item in items]
+        ).values_list('product_id', flat=True)
+    }
+    for item in items:
+        item[field] = item['id'] in wishlisted
+    return items
+
+
+class WishlistStateListSerializer(serializers.ListSerializer):
+    """
+    Preloads the wishlist flags for every product in the list before the
+    children are rendered, instead of one EXISTS query per row.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        product_field = getattr(self.child.Meta, 'wishlist_product_field', 'pk')
+        load_wishlist_state(self.context, [getattr(item, product_field) for item in items])
+        return super().to_representation(items)
+
+
 class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.SerializerMethodField()
+    product_count = serializers.IntegerField(source='active_product_count', read_only=True)
+    image_srcset = ImageSrcsetField(source='image')
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'image', 'product_count']
-
-    def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        fields = ['id', 'name', 'description', 'image', 'image_srcset', 'parent', 'product_count']
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = ImageSrcsetField(source='image')
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'is_primary', 'order']
+        fields = ['id', 'image', 'srcset', 'alt_text', 'is_primary', 'order']
 
 
 class ProductVariantSerializer(serializers.ModelSerializer):
@@ -44,11 +106,12 @@ class ProductReviewSerializer(serializers.ModelSerializer):
 class ProductListSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     discount_percentage = serializers.ReadOnlyField()
-    is_in_stock = serializers.ReadOnlyField()
+    is_in_stock = serializers.ReadOnlyField(source='stats.is_in_stock')
     is_wishlisted = serializers.SerializerMethodField()
-    isOnSale = serializers.SerializerMethodField()
-    reviewCount = serializers.IntegerField(source='review_count', read_only=True)
+    isOnSale = serializers.ReadOnlyField(source='is_on_sale')
+    reviewCount = serializers.IntegerField(source='stats.review_count', read_only=True)
     price = serializers.SerializerMethodField()
     original_price = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
@@ -56,23 +119,20 @@ class ProductListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ['id', 'name', 'price', 'original_price', 'category_name',
-                  'image', 'rating', 'reviewCount', 'discount_percentage',
+                  'image', 'image_srcset', 'rating', 'reviewCount', 'discount_percentage',
                   'is_in_stock', 'is_featured', 'is_wishlisted', 'isOnSale']
+        list_serializer_class = WishlistStateListSerializer
 
     def get_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
-        if primary_image:
-            return self.context['request'].build_absolute_uri(primary_image.image.url)
+        if obj.primary_image:
+            return self.context['request'].build_absolute_uri(default_storage.url(obj.primary_image))
         return None
 
-    def get_is_wishlisted(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            return Wishlist.objects.filter(user=user, product=obj).exists()
-        return False
+    def get_image_srcset(self, obj):
+        return srcset(self.get_image(obj))
 
-    def get_isOnSale(self, obj):
-        return bool(obj.original_price and obj.original_price > obj.price)
+    def get_is_wishlisted(self, obj):
+        return is_wishlisted(self.context, obj.pk)
 
     def get_price(self, obj):
         return int(obj.price)
@@ -81,18 +141,67 @@ class ProductListSerializer(serializers.ModelSerializer):
         return int(obj.original_price) if obj.original_price else None
 
     def get_rating(self, obj):
-        return int(obj.rating)
+        return int(obj.stats.rating)
+
+# Columns read by serialize_product_rows; created_at also serves as the default keyset position
+PRODUCT_LIST_VALUES = (
+    'id', 'name', 'price', 'original_price', 'category__name', 'primary_image', 'stats__rating',
+    'stats__review_count', 'stats__stock_quantity', 'stats__variant_stock', 'is_featured', 'discount_percentage',
+    'is_on_sale', 'created_at',
+)
+
+
+def product_list_rows(queryset):
+    """``queryset`` as values() rows for serialize_product_rows, plus its ordering columns."""
+    ordering = [field.lstrip('-') for field in queryset.query.order_by if isinstance(field, str)]
+    extra = [field for field in ordering if field not in PRODUCT_LIST_VALUES and field != 'pk']
+    return queryset.values(*PRODUCT_LIST_VALUES, *extra)
+
+
+def serialize_product_rows(rows, context):
+    """
+    Same output as ProductListSerializer(many=True), built from product_list_rows()
+    dicts in one loop, without model instances or per-field serializer calls.
+    """
+    rows = list(rows)
+    wishlist_state = load_wishlist_state(context, [row['id'] for row in rows])
+    absolute_uri = context['request'].build_absolute_uri
+    storage_url = default_storage.url
+    data = []
+    for row in rows:
+        price = row['price']
+        original_price = row['original_price']
+        image = absolute_uri(storage_url(row['primary_image'])) if row['primary_image'] else None
+        data.append({
+            'id': str(row['id']),
+            'name': row['name'],
+            'price': int(price),
+            'original_price': int(original_price) if original_price else None,
+            'category_name': row['category__name'],
+            'image': image,
+            'image_srcset': srcset(image),
+            'rating': int(row['stats__rating']),
+            'reviewCount': row['stats__review_count'],
+            'discount_percentage': row['discount_percentage'],
+            'is_in_stock': row['stats__stock_quantity'] > 0 or row['stats__variant_stock'] > 0,
+            'is_featured': row['is_featured'],
+            'is_wishlisted': wishlist_state[row['id']],
+            'isOnSale': row['is_on_sale'],
+        })
+    return data
+
 
 class ProductDetailSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
-    reviews = ProductReviewSerializer(many=True, read_only=True)
+    reviews = ProductReviewSerializer(source='recent_reviews', many=True, read_only=True)
     discountPercentage = serializers.ReadOnlyField(source='discount_percentage')
-    inStock = serializers.ReadOnlyField(source='is_in_stock')
-    reviewCount = serializers.IntegerField(source='review_count', read_only=True)
+    inStock = serializers.ReadOnlyField(source='stats.is_in_stock')
+    reviewCount = serializers.IntegerField(source='stats.review_count', read_only=True)
+    ratingHistogram = serializers.ReadOnlyField(source='stats.rating_histogram')
     originalPrice = serializers.SerializerMethodField()
-    isOnSale = serializers.SerializerMethodField()
+    isOnSale = serializers.ReadOnlyField(source='is_on_sale')
     isWishlisted = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
     features = serializers.SerializerMethodField()
@@ -103,27 +212,51 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'description', 'price', 'originalPrice', 'rating', 'reviewCount',
+            'id', 'name', 'description', 'price', 'originalPrice', 'rating', 'reviewCount', 'ratingHistogram',
             'inStock', 'isWishlisted', 'isOnSale', 'discountPercentage', 'features',
             'images', 'colors', 'sizes', 'category', 'variants', 'reviews', 'created_at'
         ]
+        list_serializer_class = WishlistStateListSerializer
+
+    @staticmethod
+    def prefetch_lookups():
+        """Lookups the detail payload reads; views prefetch them for many products at once."""
+        return [
+            'images',
+            'variants',
+            Prefetch(
+                'reviews',
+                queryset=ProductReview.objects.select_related('user').order_by('-created_at', '-id')[
+                    :settings.PRODUCT_DETAIL_REVIEW_LIMIT
+                ],
+                to_attr='recent_reviews',
+            ),
+        ]
+
+    def to_representation(self, instance):
+        # Variants are loaded once for the variants, colors and sizes fields, and
+        # only the newest reviews are embedded; the rest are paginated by
+        # ProductViewSet.reviews. Lookups prefetched by the view are not repeated.
+        prefetch_related_objects([instance], *self.prefetch_lookups())
+        return super().to_representation(instance)
+
+    def _active_variants(self, obj, variant_type):
+        return [
+            variant for variant in obj.variants.all()
+            if variant.type == variant_type and variant.is_active
+        ]
+
     def get_price(self, obj):
         return float(obj.price)
 
     def get_originalPrice(self, obj):
         return float(obj.original_price) if obj.original_price else None
 
-    def get_isOnSale(self, obj):
-        return bool(obj.original_price and obj.original_price > obj.price)
-
     def get_isWishlisted(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            return Wishlist.objects.filter(user=user, product=obj).exists()
-        return False
+        return is_wishlisted(self.context, obj.pk)
 
     def get_rating(self, obj):
-        return float(obj.rating)
+        return float(obj.stats.rating)
 
     def get_features(self, obj):
         # If features were stored in Product.features (JSONField or text list), just return that
@@ -137,7 +270,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         ]  # Replace with obj.features if stored
 
     def get_colors(self, obj):
-        colors = obj.variants.filter(type='color', is_active=True)
+        colors = self._active_variants(obj, 'color')
         return [
             {
                 "id": color.value.lower().replace(" ", "-"),
@@ -149,7 +282,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_sizes(self, obj):
-        sizes = obj.variants.filter(type='size', is_active=True)
+        sizes = self._active_variants(obj, 'size')
         return [
             {
                 "id": size.value.lower().replace(" ", "-"),
@@ -167,6 +300,8 @@ class WishlistSerializer(serializers.ModelSerializer):
         model = Wishlist
         fields = ['id', 'product', 'created_at']
         read_only_fields = ['id', 'created_at']
+        list_serializer_class = WishlistStateListSerializer
+        wishlist_product_field = 'product_id'
 
 
 class WishlistCreateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,303 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.core.images import register_derivatives
+from .cache import bump_catalog_version, invalidate_tags
+from .denormalized import (
+    adjust_active_product_count, adjust_review_aggregates, adjust_variant_stock, move_category_subtree,
+    refresh_primary_image,
+)
+from .models import Category, Product, ProductImage, ProductReview, ProductStats, ProductVariant
+from .search import update_search_vectors
+from .search_index import INDEXED_PRODUCT_FIELDS, search_index_log
+from .similarity import embed_after_commit
+from .suggest import SUGGESTED_PRODUCT_FIELDS, suggestion_index_log
+
+# Product fields whose previous value the post_save handlers need to diff against
+TRACKED_PRODUCT_FIELDS = [
+    'category_id', 'is_active', 'is_featured', 'name', 'description', 'sku', 'color',
+]
+TRACKED_CATEGORY_FIELDS = ['name', 'is_active', 'parent_id', 'path']
+SEARCH_DOCUMENT_FIELDS = ['category_id', 'name', 'description']
+EMBEDDING_DOCUMENT_FIELDS = ['category_id', 'name', 'description', 'color', 'is_active']
+# ProductVariant fields behind ProductStats.variant_stock
+VARIANT_STOCK_FIELDS = ['product_id', 'stock_quantity', 'is_active']
+
+
+register_derivatives(ProductImage, 'image')
+register_derivatives(Category, 'image')
+
+
+def has_changed(instance, fields):
+    previous = getattr(instance, '_previous_state', None)
+    if previous is None:
+        return True
+    return any(previous[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def sync_primary_image(sender, instance, **kwargs):
+    refresh_primary_image(instance.product_id)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_product_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    # Fixture loads (raw) may overwrite existing rows while still flagged as adding
+    if raw or not instance._state.adding:
+        instance._previous_state = (
+            Product.objects.filter(pk=instance.pk).values(*TRACKED_PRODUCT_FIELDS).first()
+        )
+
+
+@receiver(pre_save, sender=Product)
+def apply_sale_state_on_raw_save(sender, instance, raw=False, **kwargs):
+    # Fixture loads skip Product.save(), the stored sale state still follows their prices
+    if raw:
+        instance.apply_sale_state()
+
+
+@receiver(post_save, sender=Product)
+def create_product_stats_row(sender, instance, created, raw=False, **kwargs):
+    # Fixture loads carry their own ProductStats rows
+    if created and not raw:
+        ProductStats.objects.get_or_create(product=instance)
+
+
+@receiver(post_save, sender=Product)
+def sync_category_count_on_save(sender, instance, **kwargs):
+    # Other edits leave the counters alone instead of a -1/+1 pair on the hot category row
+    if not has_changed(instance, ['category_id', 'is_active']):
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if previous and previous['is_active']:
+        adjust_active_product_count(previous['category_id'], -1)
+    if instance.is_active:
+        adjust_active_product_count(instance.category_id, 1)
+
+
+@receiver(post_save, sender=Product)
+def sync_search_vector(sender, instance, **kwargs):
+    if has_changed(instance, SEARCH_DOCUMENT_FIELDS):
+        update_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Product)
+def sync_embedding(sender, instance, **kwargs):
+    if settings.PRODUCT_EMBEDDINGS_ON_SAVE and has_changed(instance, EMBEDDING_DOCUMENT_FIELDS):
+        embed_after_commit(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_review_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or not instance._state.adding:
+        instance._previous_state = (
+            ProductReview.objects.filter(pk=instance.pk).values('product_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=ProductReview)
+def sync_review_aggregates_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if previous and not has_changed(instance, ['product_id', 'rating']):
+        return
+    if previous and previous['product_id'] != instance.product_id:
+        adjust_review_aggregates(previous['product_id'], {previous['rating']: -1})
+        previous = None
+    changes = {instance.rating: 1}
+    if previous:
+        changes[previous['rating']] = changes.get(previous['rating'], 0) - 1
+    adjust_review_aggregates(instance.product_id, changes)
+
+
+@receiver(post_delete, sender=ProductReview)
+def sync_review_aggregates_on_delete(sender, instance, **kwargs):
+    adjust_review_aggregates(instance.product_id, {instance.rating: -1})
+
+
+def variant_stock_contribution(is_active, stock_quantity):
+    return stock_quantity if is_active else 0
+
+
+@receiver(pre_save, sender=ProductVariant)
+def remember_previous_variant_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or not instance._state.adding:
+        instance._previous_state = (
+            ProductVariant.objects.filter(pk=instance.pk).values(*VARIANT_STOCK_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=ProductVariant)
+def sync_variant_stock_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if previous and not has_changed(instance, VARIANT_STOCK_FIELDS):
+        return
+    # Deltas rather than a recount, so concurrent stock updates serialize on the stats row
+    if previous:
+        adjust_variant_stock(
+            previous['product_id'], -variant_stock_contribution(previous['is_active'], previous['stock_quantity'])
+        )
+    adjust_variant_stock(
+        instance.product_id, variant_stock_contribution(instance.is_active, instance.stock_quantity)
+    )
+
+
+@receiver(post_delete, sender=ProductVariant)
+def sync_variant_stock_on_delete(sender, instance, **kwargs):
+    adjust_variant_stock(instance.product_id, -variant_stock_contribution(instance.is_active, instance.stock_quantity))
+
+
+@receiver(pre_save, sender=Category)
+def remember_previous_category_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if raw or not instance._state.adding:
+        instance._previous_state = (
+            Category.objects.filter(pk=instance.pk).values(*TRACKED_CATEGORY_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Category)
+def sync_descendant_paths(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if previous and previous['path'] and previous['path'] != instance.path:
+        move_category_subtree(previous['path'], instance.path)
+
+
+@receiver(post_save, sender=Category)
+def sync_category_search_vectors(sender, instance, created, **kwargs):
+    if not created and has_changed(instance, ['name']):
+        update_search_vectors(Product.objects.filter(category=instance))
+        if settings.PRODUCT_EMBEDDINGS_ON_SAVE:
+            embed_after_commit(Product.objects.filter(category=instance))
+
+
+@receiver(post_delete, sender=Product)
+def sync_category_count_on_delete(sender, instance, **kwargs):
+    if instance.is_active:
+        adjust_active_product_count(instance.category_id, -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_catalog_caches(sender, instance, **kwargs):
+    # Bump after commit so no reader can cache pre-commit data under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
+def invalidate_response_tags(tags):
+    transaction.on_commit(lambda: invalidate_tags(tags))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_responses(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    tags = {f'product:{instance.pk}', 'products'}
+    if instance.is_featured or (previous and previous['is_featured']):
+        tags.add('featured')
+    if previous is None or has_changed(instance, ['category_id', 'is_active']):
+        # Active product counts moved: category listings and embedded categories
+        tags.update({'categories', f'category:{instance.category_id}'})
+        if previous:
+            tags.add(f"category:{previous['category_id']}")
+    invalidate_response_tags(tags)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_image_responses(sender, instance, **kwargs):
+    # The primary image is part of every listing entry
+    invalidate_response_tags({f'product:{instance.product_id}', 'products', 'featured'})
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_variant_responses(sender, instance, signal, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    tags = {f'product:{instance.product_id}'}
+    if previous:
+        tags.add(f"product:{previous['product_id']}")
+    if signal is post_delete or has_changed(instance, VARIANT_STOCK_FIELDS):
+        # Listings show whether the product is in stock, which the variant may have flipped
+        tags.update({'products', 'featured'})
+    invalidate_response_tags(tags)
+
+
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_review_responses(sender, instance, **kwargs):
+    # Listings show the rating aggregates the review just moved
+    invalidate_response_tags({f'product:{instance.product_id}', 'products', 'featured'})
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    tags = {'categories', f'category:{instance.pk}'}
+    if has_changed(instance, ['name', 'parent_id']):
+        # Listings show the category name, and a moved subtree changes what parent filters match
+        tags.update({'products', 'featured'})
+    invalidate_response_tags(tags)
+
+
+def log_index_change(log, kind, pk):
+    # Every process, this one included, replays the entry on its next lookup
+    transaction.on_commit(lambda: log.append((kind, pk)))
+
+
+@receiver(post_save, sender=Product)
+def sync_search_index_on_save(sender, instance, **kwargs):
+    if has_changed(instance, INDEXED_PRODUCT_FIELDS):
+        log_index_change(search_index_log, 'product', instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def sync_search_index_on_delete(sender, instance, **kwargs):
+    log_index_change(search_index_log, 'product', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def sync_search_index_on_category_rename(sender, instance, created, **kwargs):
+    if not created and has_changed(instance, ['name']):
+        log_index_change(search_index_log, 'category', instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def sync_suggestions_on_product_save(sender, instance, **kwargs):
+    if has_changed(instance, SUGGESTED_PRODUCT_FIELDS):
+        log_index_change(suggestion_index_log, 'product', instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def sync_suggestions_on_product_delete(sender, instance, **kwargs):
+    log_index_change(suggestion_index_log, 'product', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def sync_suggestions_on_category_save(sender, instance, **kwargs):
+    if has_changed(instance, ['name', 'is_active']):
+        log_index_change(suggestion_index_log, 'category', instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def sync_suggestions_on_category_delete(sender, instance, **kwargs):
+    log_index_change(suggestion_index_log, 'category', instance.pk)
+
+
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def sync_suggestions_on_review(sender, instance, **kwargs):
+    # The replay re-reads the stats row, whose rating sets the product's weight
+    log_index_change(suggestion_index_log, 'product', instance.product_id)
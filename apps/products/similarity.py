@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import math
+import re
+import uuid
+import zlib
+from collections import Counter
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Max, When
+from django.utils.module_loading import import_string
+from pgvector.django import CosineDistance
+from .cache import invalidate_tags
+from .models import Product, ProductEmbedding
+
+logger = logging.getLogger(__name__)
+
+# Embedded document field -> Product values() column
+DOCUMENT_FIELDS = {
+    'name': 'name',
+    'description': 'description',
+    'category': 'category__name',
+    'color': 'color',
+}
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or our that the this to with you your'.split()
+)
+
+
+class HashingEmbedder:
+    """
+    Local, deterministic embedder. Words of every field, name word pairs and
+    name character trigrams (so "headphone" still meets "headphones") are
+    hashed into ``dimensions`` signed buckets, weighted by field with
+    log-scaled counts, and the vector L2 normalized. There is no corpus-wide
+    IDF: a product's vector depends only on its own text, so re-embedding
+    just the changed products is exact.
+    """
+    name = 'hashing-v1'
+    field_weights = {'name': 3.0, 'category': 2.0, 'color': 1.5, 'description': 1.0}
+    pair_weight = 1.5
+    trigram_weight = 0.5
+
+    def __init__(self, dimensions=None):
+        self.dimensions = dimensions or settings.PRODUCT_EMBEDDING_DIMENSIONS
+        self._buckets = {}
+
+    def features(self, document):
+        weights = Counter()
+        for field, weight in self.field_weights.items():
+            words = [word for word in TOKEN_RE.findall((document.get(field) or '').lower()) if word not in STOP_WORDS]
+            terms = [(Counter(words), weight)]
+            if field == 'name':
+                padded = [f' {word} ' for word in words]
+                terms.append((Counter(f'{left} {right}' for left, right in zip(words, words[1:])), self.pair_weight))
+                terms.append((
+                    Counter(f'#{word[i:i + 3]}' for word in padded for i in range(len(word) - 2)),
+                    self.trigram_weight,
+                ))
+            for counts, term_weight in terms:
+                for term, count in counts.items():
+                    weights[term] += term_weight * (1 + math.log(count))
+        return weights
+
+    def bucket(self, feature):
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            code = zlib.crc32(feature.encode())
+            # Low bits pick the dimension and the top bit the sign, so collisions cancel out on average
+            bucket = self._buckets[feature] = (code % self.dimensions, 1.0 if code & 0x80000000 else -1.0)
+        return bucket
+
+    def embed(self, documents):
+        vectors = np.zeros((len(documents), self.dimensions), np.float32)
+        for row, document in enumerate(documents):
+            for feature, weight in self.features(document).items():
+                index, sign = self.bucket(feature)
+                vectors[row, index] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+
+def get_embedder():
+    return import_string(settings.PRODUCT_EMBEDDING_PROVIDER)()
+
+
+def product_document(row):
+    return {field: row[column] or '' for field, column in DOCUMENT_FIELDS.items()}
+
+
+def content_hash(embedder, document):
+    return hashlib.sha256(json.dumps([embedder.name, document], sort_keys=True).encode()).hexdigest()
+
+
+def write_embeddings(embedder, pending):
+    """Embed and upsert ``pending`` (product id, document, hash) triples; returns the rows written."""
+    if not pending:
+        return 0
+    vectors = np.asarray(embedder.embed([document for _, document, _ in pending]), dtype=np.float32)
+    if vectors.shape != (len(pending), settings.PRODUCT_EMBEDDING_DIMENSIONS):
+        raise ValueError(
+            f'{embedder.name} returned vectors of shape {vectors.shape}, '
+            f'expected ({len(pending)}, {settings.PRODUCT_EMBEDDING_DIMENSIONS})'
+        )
+    # A zero vector has no direction to compare, such products are left out
+    rows = [
+        ProductEmbedding(product_id=product_id, embedding=vector, provider=embedder.name, content_hash=digest)
+        for (product_id, _, digest), vector in zip(pending, vectors) if vector.any()
+    ]
+    ProductEmbedding.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['product'],
+        update_fields=['embedding', 'provider', 'content_hash', 'updated_at'],
+    )
+    return len(rows)
+
+
+def embed_products(products=None, full=False, batch_size=500):
+    """
+    Embed the active ``products`` (default all) whose document or provider
+    changed since they were last embedded (every one with ``full``), and
+    drop the vectors of inactive ones. Returns (checked, embedded, removed).
+    """
+    embedder = get_embedder()
+    products = Product.objects.all() if products is None else products
+    removed, _ = ProductEmbedding.objects.filter(product__in=products.filter(is_active=False)).delete()
+
+    rows = (
+        products.filter(is_active=True).order_by()
+        .values('pk', *DOCUMENT_FIELDS.values(), 'embedding__content_hash')
+    )
+    checked = embedded = 0
+    pending = []
+    for row in rows.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE):
+        checked += 1
+        document = product_document(row)
+        digest = content_hash(embedder, document)
+        if full or digest != row['embedding__content_hash']:
+            pending.append((row['pk'], document, digest))
+        if len(pending) == batch_size:
+            embedded += write_embeddings(embedder, pending)
+            pending = []
+    embedded += write_embeddings(embedder, pending)
+    if embedded or removed:
+        transaction.on_commit(lambda: invalidate_tags({'similar'}))
+    return checked, embedded, removed
+
+
+def embed_after_commit(products):
+    """Re-embed ``products`` once the current transaction commits, for save signals."""
+    def embed():
+        try:
+            embed_products(products)
+        except Exception:
+            # The old vectors keep serving; the embed_products command catches up later
+            logger.exception('Could not embed products')
+    transaction.on_commit(embed)
+
+
+_matrix_cache = {}
+
+
+def embedding_matrix():
+    """
+    (product ids, normalized vectors) of every stored embedding, loaded once
+    per process and reloaded when the table's row count or latest write moves.
+    """
+    version = tuple(ProductEmbedding.objects.aggregate(count=Count('pk'), latest=Max('updated_at')).values())
+    if _matrix_cache.get('version') != version:
+        rows = ProductEmbedding.objects.values_list('product_id', 'embedding')
+        product_ids, vectors = [], []
+        for product_id, vector in rows.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE):
+            product_ids.append(product_id)
+            vectors.append(vector)
+        matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        _matrix_cache.update(version=version, product_ids=product_ids, matrix=matrix,
+                             positions={product_id: index for index, product_id in enumerate(product_ids)})
+    return _matrix_cache
+
+
+class NumpySimilarityBackend:
+    """
+    Exact cosine search over every stored vector with NumPy, for databases
+    without pgvector. One matrix-vector product per lookup: fine for
+    development and catalogs of tens of thousands of products.
+    """
+
+    def similar(self, queryset, product_id, limit):
+        data = embedding_matrix()
+        position = data['positions'].get(uuid.UUID(str(product_id)))
+        if position is None or limit < 1:
+            return queryset.none()
+        scores = data['matrix'] @ data['matrix'][position]
+        scores[position] = -np.inf
+        # Over-fetch a little: inactive products may still have a vector until the next embed run
+        count = min(limit * 2, len(scores) - 1)
+        if count < 1:
+            return queryset.none()
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        product_ids = [data['product_ids'][index] for index in top]
+        rank = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(product_ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=product_ids).annotate(similarity_rank=rank).order_by('similarity_rank')
+
+
+class PgvectorSimilarityBackend:
+    """
+    Nearest products by cosine distance through the HNSW index on
+    ProductEmbedding.embedding: approximate, and a few index pages per lookup
+    whatever the catalog size. Falls back to exact NumPy search on other
+    database vendors.
+    """
+
+    fallback = NumpySimilarityBackend
+
+    def similar(self, queryset, product_id, limit):
+        if connection.vendor != 'postgresql':
+            return self.fallback().similar(queryset, product_id, limit)
+        target = ProductEmbedding.objects.filter(product_id=product_id).values_list('embedding', flat=True).first()
+        if target is None or limit < 1:
+            return queryset.none()
+        # ORDER BY distance LIMIT n over the whole table is the shape the index
+        # answers; the product itself comes back first and is dropped afterwards
+        nearest = (
+            ProductEmbedding.objects.order_by(CosineDistance('embedding', target))
+            .values('product_id')[:limit * 2 + 1]
+        )
+        return (
+            queryset.filter(pk__in=nearest).exclude(pk=product_id)
+            .annotate(similarity_distance=CosineDistance('embedding__embedding', target))
+            .order_by('similarity_distance')
+        )
+
+
+def get_similarity_backend():
+    return import_string(settings.PRODUCT_SIMILARITY_BACKEND)()
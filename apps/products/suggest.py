@@ -0,0 +1,212 @@
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+from operator import itemgetter
+from django.db import DatabaseError
+from .index_log import ChangeLog, IndexReplica
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Upper bound for ?limit=
+SUGGEST_MAX_LIMIT = 20
+
+SUGGESTION_INDEX_TAG = 'suggestion-index'
+# Product fields the index reads; saves touching none of them leave it alone
+SUGGESTED_PRODUCT_FIELDS = ['is_active', 'name', 'sku']
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall((text or '').lower()))
+
+
+def product_weight(rating, review_count):
+    return float(rating) * math.log2(review_count + 2)
+
+
+def category_weight(active_product_count):
+    return math.log2(active_product_count + 2)
+
+
+class SuggestionIndex:
+    """
+    Sorted array of (key, -weight, type, id) entries over active product names,
+    SKUs and category names. A prefix maps to one contiguous slice found by
+    binary search. The ranking of each prefix is memoized a few entries deeper
+    than SUGGEST_MAX_LIMIT and patched in place on updates, so activations and
+    deactivations do not force short, expensive prefixes to be re-ranked.
+    """
+
+    warm_prefix_length = 2
+    memo_depth = SUGGEST_MAX_LIMIT * 2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.entries = []
+        self.payloads = {}  # (type, id) -> suggestion dict
+        self.keys = {}      # (type, id) -> entries added for it
+        self._top = {}      # normalized prefix -> [[(-weight, ref), ...], whole range fits]
+        self.is_built = False
+        self.version = None
+
+    def build(self, version=None):
+        products = (
+            Product.objects.filter(is_active=True)
+            .values_list('pk', 'name', 'sku', 'stats__rating', 'stats__review_count')
+            .iterator(chunk_size=5000)
+        )
+        categories = Category.objects.filter(is_active=True).values_list('pk', 'name', 'active_product_count')
+        with self._lock:
+            self._reset()
+            for product_id, name, sku, rating, review_count in products:
+                self._add_product(product_id, name, sku, rating, review_count, sort=False)
+            for category_id, name, active_product_count in categories:
+                self._add_category(category_id, name, active_product_count, sort=False)
+            self.entries.sort()
+            self._warm()
+            self.is_built = True
+            self.version = version
+
+    def _warm(self):
+        prefixes = {entry[0][:length] for entry in self.entries for length in range(1, self.warm_prefix_length + 1)}
+        for prefix in prefixes:
+            self._ranked(prefix)
+
+    # Updates
+
+    @staticmethod
+    def _word_keys(text):
+        words = normalize(text).split()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def _insert(self, ref, keys, weight, payload, sort=True):
+        entries = [(key, -weight, *ref) for key in keys if key]
+        for entry in entries:
+            if sort:
+                bisect.insort(self.entries, entry)
+                self._memo_insert(entry[0], (-weight, ref))
+            else:
+                # Bulk load: sorted and ranked once at the end of build()
+                self.entries.append(entry)
+        self.keys[ref] = entries
+        self.payloads[ref] = payload
+
+    def _add_product(self, product_id, name, sku, rating, review_count, sort=True):
+        ref = ('product', str(product_id))
+        keys = self._word_keys(name) | {normalize(sku)}
+        payload = {'type': 'product', 'id': ref[1], 'text': name, 'sku': sku}
+        self._insert(ref, keys, product_weight(rating, review_count), payload, sort)
+
+    def _add_category(self, category_id, name, active_product_count, sort=True):
+        ref = ('category', str(category_id))
+        payload = {'type': 'category', 'id': ref[1], 'text': name}
+        self._insert(ref, self._word_keys(name), category_weight(active_product_count), payload, sort)
+
+    def _discard(self, ref):
+        for entry in self.keys.pop(ref, ()):
+            position = bisect.bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+            self._memo_remove(entry[0], ref)
+        self.payloads.pop(ref, None)
+
+    def _memo_insert(self, key, item):
+        for length in range(1, len(key) + 1):
+            memo = self._top.get(key[:length])
+            if memo is None:
+                continue
+            ranked, complete = memo
+            if any(ref == item[1] for _, ref in ranked):
+                continue
+            # Hidden entries all rank below the last memoized one, so a newcomer is
+            # only safe to add when it ranks above it or the whole range is memoized
+            if complete or (ranked and item < ranked[-1]):
+                bisect.insort(ranked, item)
+                if len(ranked) > self.memo_depth:
+                    ranked.pop()
+                    memo[1] = False
+
+    def _memo_remove(self, key, ref):
+        for length in range(1, len(key) + 1):
+            prefix = key[:length]
+            memo = self._top.get(prefix)
+            if memo is None:
+                continue
+            ranked, complete = memo
+            ranked[:] = [item for item in ranked if item[1] != ref]
+            if not complete and len(ranked) < SUGGEST_MAX_LIMIT:
+                del self._top[prefix]
+
+    def replay(self, entries):
+        """Apply ChangeLog entries in place, reloading the rows they name."""
+        product_ids = {pk for kind, pk in entries if kind == 'product'}
+        category_ids = {pk for kind, pk in entries if kind == 'category'}
+        products = {
+            row[0]: row for row in Product.objects.filter(pk__in=product_ids, is_active=True)
+            .values_list('pk', 'name', 'sku', 'stats__rating', 'stats__review_count')
+        }
+        categories = {
+            row[0]: row for row in Category.objects.filter(pk__in=category_ids, is_active=True)
+            .values_list('pk', 'name', 'active_product_count')
+        }
+        with self._lock:
+            for product_id in product_ids:
+                self._discard(('product', str(product_id)))
+                if product_id in products:
+                    self._add_product(*products[product_id])
+            for category_id in category_ids:
+                self._discard(('category', str(category_id)))
+                if category_id in categories:
+                    self._add_category(*categories[category_id])
+
+    # Querying
+
+    def _ranked(self, prefix):
+        memo = self._top.get(prefix)
+        if memo is None:
+            low = bisect.bisect_left(self.entries, (prefix,))
+            high = bisect.bisect_left(self.entries, (prefix + '\uffff',))
+            ranked = []
+            seen = set()
+            scanned = self.memo_depth * 4
+            # Several keys of one object can share a prefix, so over-fetch before de-duplicating
+            for entry in heapq.nsmallest(scanned, self.entries[low:high], key=itemgetter(1)):
+                ref = entry[2:]
+                if ref not in seen:
+                    seen.add(ref)
+                    ranked.append((entry[1], ref))
+                if len(ranked) == self.memo_depth:
+                    break
+            memo = self._top[prefix] = [ranked, len(ranked) < self.memo_depth and high - low <= scanned]
+        return [ref for _, ref in memo[0]]
+
+    def suggest(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self._lock:
+            return [self.payloads[ref] for ref in self._ranked(prefix)[:limit]]
+
+
+suggestion_index_log = ChangeLog(SUGGESTION_INDEX_TAG)
+_replica = IndexReplica(SuggestionIndex, suggestion_index_log)
+
+
+def get_suggestion_index():
+    """The process-wide suggestion index, built from the database on first use and kept current from its log."""
+    return _replica.get()
+
+
+def warm_suggestion_index():
+    try:
+        get_suggestion_index()
+    except DatabaseError:
+        logger.exception('Could not build the product suggestion index at startup')
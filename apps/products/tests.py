@@ -0,0 +1,221 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+from .index_log import REBUILD
+from .models import Category, Product, ProductEmbedding, ProductReview, ProductStats, ProductVariant, Wishlist
+from .pagination import EstimatedCountPaginator
+from .search_index import ProductSearchIndex, get_search_index, search_index_log
+from .serializers import ProductListSerializer, product_list_rows, serialize_product_rows
+from .suggest import SuggestionIndex, get_suggestion_index, suggestion_index_log
+
+User = get_user_model()
+
+
+def create_products(category, count, **kwargs):
+    return [
+        Product.objects.create(
+            name=f'Product {i}', description='Test product', price=Decimal('10.00') + i,
+            category=category, sku=f'TEST-{category.pk.hex[:8]}-{i}', **kwargs,
+        )
+        for i in range(count)
+    ]
+
+
+class WishlistFlagQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shopper', email='shopper@example.com', password='secret')
+        cls.category = Category.objects.create(name='Audio')
+        cls.products = create_products(cls.category, 30)
+        for product in cls.products[::3]:
+            Wishlist.objects.create(user=cls.user, product=product)
+
+    def serialize(self, size):
+        request = RequestFactory().get('/api/products/products/')
+        request.user = self.user
+        products = list(
+            Product.objects.filter(pk__in=[product.pk for product in self.products[:size]])
+            .select_related('category', 'stats')
+        )
+        with self.assertNumQueries(1):
+            return ProductListSerializer(products, many=True, context={'request': request}).data
+
+    def test_wishlist_flags_cost_one_query_whatever_the_page_size(self):
+        wishlisted = {str(product.pk) for product in self.products[::3]}
+        for size in (1, 10, 30):
+            with self.subTest(size=size):
+                data = self.serialize(size)
+                self.assertEqual(len(data), size)
+                for item in data:
+                    self.assertEqual(item['is_wishlisted'], item['id'] in wishlisted)
+
+
+class SearchIndexReplayTests(TestCase):
+    def test_changes_made_by_another_process_are_replayed_without_a_rebuild(self):
+        category = Category.objects.create(name='Audio')
+        product = Product.objects.create(
+            name='Wireless headphones', description='Over-ear', price=Decimal('99.00'),
+            category=category, sku='TEST-HEADPHONES',
+        )
+        self.assertIn(product.pk, get_search_index().search('headphones'))
+
+        # Another worker renames the product: no signal runs here, only its log entry arrives
+        Product.objects.filter(pk=product.pk).update(name='Wireless earbuds')
+        search_index_log.append(('product', product.pk))
+
+        with mock.patch.object(ProductSearchIndex, 'build', side_effect=AssertionError('rebuilt')):
+            index = get_search_index()
+            self.assertNotIn(product.pk, index.search('headphones'))
+            self.assertIn(product.pk, index.search('earbuds'))
+
+
+class SuggestionIndexReplayTests(TestCase):
+    def test_changes_made_by_another_process_are_replayed_without_a_rebuild(self):
+        category = Category.objects.create(name='Audio')
+        product = Product.objects.create(
+            name='Wireless headphones', description='Over-ear', price=Decimal('99.00'),
+            category=category, sku='TEST-HEADPHONES',
+        )
+        suggested = [item['id'] for item in get_suggestion_index().suggest('wireless')]
+        self.assertIn(str(product.pk), suggested)
+
+        Product.objects.filter(pk=product.pk).update(is_active=False)
+        suggestion_index_log.append(('product', product.pk))
+
+        with mock.patch.object(SuggestionIndex, 'build', side_effect=AssertionError('rebuilt')):
+            suggested = [item['id'] for item in get_suggestion_index().suggest('wireless')]
+        self.assertNotIn(str(product.pk), suggested)
+
+
+@override_settings(PAGINATION_ESTIMATE_THRESHOLD=1)
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_products(Category.objects.create(name='Audio'), 50)
+
+    def test_pages_past_an_underestimated_count(self):
+        with mock.patch('apps.products.pagination.estimate_count', return_value=30):
+            paginator = EstimatedCountPaginator(Product.objects.order_by('sku'), 10)
+            page = paginator.page(3)
+            self.assertTrue(paginator.count_is_estimate)
+            self.assertEqual(paginator.num_pages, 3)
+            self.assertTrue(page.has_next())
+            self.assertEqual(page.next_page_number(), 4)
+            self.assertEqual(page.previous_page_number(), 2)
+
+            last = paginator.page(5)
+            self.assertEqual(len(last), 10)
+            self.assertFalse(last.has_next())
+
+
+class ProductRowSerializationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rows', email='rows@example.com', password='secret')
+        category = Category.objects.create(name='Footwear')
+        plain, pictured, on_sale, variant_stock = create_products(category, 4)
+
+        Wishlist.objects.create(user=cls.user, product=pictured)
+        Product.objects.filter(pk=pictured.pk).update(primary_image='products/shoe.png')
+        ProductStats.objects.filter(product=pictured).update(stock_quantity=3)
+
+        on_sale.original_price = on_sale.price * 2
+        on_sale.save()
+        ProductReview.objects.create(product=on_sale, user=cls.user, rating=4, title='Good', comment='Fits well')
+
+        ProductVariant.objects.create(product=variant_stock, type='size', name='Size', value='42', stock_quantity=5)
+
+    def test_row_serialization_matches_the_list_serializer(self):
+        request = RequestFactory().get('/api/products/')
+        request.user = self.user
+        queryset = Product.objects.select_related('category', 'stats').order_by('sku')
+
+        expected = ProductListSerializer(queryset, many=True, context={'request': request}).data
+        actual = serialize_product_rows(product_list_rows(queryset), {'request': request})
+
+        self.assertEqual([item['is_wishlisted'] for item in actual], [False, True, False, False])
+        self.assertEqual([item['is_in_stock'] for item in actual], [False, True, False, True])
+        self.assertTrue(actual[1]['image'])
+        self.assertTrue(actual[2]['isOnSale'])
+        self.assertEqual(actual, [dict(item) for item in expected])
+
+
+class ProductImportTests(TestCase):
+    def import_products(self, records):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.jsonl')
+            with open(path, 'w') as handle:
+                handle.writelines(json.dumps(record) + '\n' for record in records)
+            call_command('import_catalog', path, kind='products', stdout=StringIO())
+
+    def test_omitted_nullable_columns_are_left_alone(self):
+        kept, cleared = create_products(
+            Category.objects.create(name='Footwear'), 2, original_price=Decimal('80.00'), color='Red',
+        )
+        self.import_products([
+            {'sku': kept.sku, 'name': 'Renamed'},
+            {'sku': cleared.sku, 'original_price': None, 'color': None},
+        ])
+
+        kept.refresh_from_db()
+        cleared.refresh_from_db()
+        self.assertEqual((kept.name, kept.original_price, kept.color), ('Renamed', Decimal('80.00'), 'Red'))
+        self.assertEqual((cleared.name, cleared.original_price, cleared.color), ('Product 1', None, None))
+
+    def test_imports_rebuild_the_in_memory_indexes_unless_only_stock_changed(self):
+        product, = create_products(Category.objects.create(name='Footwear'), 1)
+        logs = (search_index_log, suggestion_index_log)
+
+        before = [log.version() for log in logs]
+        self.import_products([{'sku': product.sku, 'stock_quantity': 7}])
+        self.assertEqual([log.version() for log in logs], before)
+
+        self.import_products([{'sku': product.sku, 'name': 'Trail runner'}])
+        for log, version in zip(logs, before):
+            self.assertEqual(log.read(version, log.version()), [REBUILD])
+
+    def test_imported_products_are_embedded(self):
+        product, = create_products(Category.objects.create(name='Footwear'), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_products([{'sku': product.sku, 'name': 'Trail runner'}])
+        self.assertTrue(ProductEmbedding.objects.filter(product=product).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+@override_settings(PAGINATION_ESTIMATE_THRESHOLD=1000)
+class ListingQueryPlanTests(TestCase):
+    def test_listing_queries_read_the_product_tables_through_indexes(self):
+        # Scaled down from a production catalog: page counts switch to the estimate
+        # early, and index probes are priced for SSD storage
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL random_page_cost = 1.1')
+        # Raises CommandError when a listing query scans the product tables sequentially
+        call_command('explain_product_listings', seed=20000, categories=20, stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Ranked full-text search needs PostgreSQL')
+@override_settings(PRODUCT_SEARCH_BACKEND='apps.products.search.PostgresSearchBackend')
+class RankedCursorPaginationTests(TestCase):
+    def test_next_links_walk_every_equally_ranked_result_once(self):
+        category = Category.objects.create(name='Audio')
+        for product in create_products(category, 12):
+            product.name = 'Wireless headphones'
+            product.save()
+
+        seen = []
+        url = '/api/products/products/?search=wireless&pagination=cursor&page_size=5'
+        while url and len(seen) <= 12:
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(len(set(seen)), 12)
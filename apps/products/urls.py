@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryListView, ProductViewSet, WishlistViewSet, SearchView,FeaturedProductsAPIView,FetchOneProductAPIView
+from .views import CategoryListView, ProductViewSet, WishlistViewSet, SearchView, FacetsView, SuggestView, ProductExportView, FeaturedProductsAPIView, FetchOneProductAPIView
 
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
@@ -9,6 +9,9 @@ router.register(r'wishlist', WishlistViewSet, basename='wishlist')
 urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('search/', SearchView.as_view(), name='product-search'),
+    path('facets/', FacetsView.as_view(), name='product-facets'),
+    path('suggest/', SuggestView.as_view(), name='product-suggest'),
+    path('export/', ProductExportView.as_view(), name='product-export'),
     path('featuredProducts/', FeaturedProductsAPIView.as_view(), name='featured-products'),
     path('product/', FetchOneProductAPIView.as_view(), name='fetch-one-product'),
     path('', include(router.urls)),
@@ -1,59 +1,310 @@
-from rest_framework import generics, viewsets, status, filters
+import hashlib
+import uuid
+from urllib.parse import urlencode
+from rest_framework import generics, viewsets, status
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly,AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly,AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg
+from django_filters.utils import translate_validation
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from apps.core.exports import export_options, export_response
+from .availability import availability_matrices
+from .cache import get_catalog_version
+from .categories import get_category_tree, serialize_category_tree
+from .exports import PRODUCT_EXPORT_COLUMNS, product_export_rows
+from .facets import FACET_PARAMS, compute_facets
+from .http_cache import cached_catalog_response
 from .models import Category, Product, ProductReview, Wishlist
 from .serializers import (
     CategorySerializer, ProductListSerializer, ProductDetailSerializer,
-    ProductReviewSerializer, WishlistSerializer, WishlistCreateSerializer
+    ProductReviewSerializer, WishlistSerializer, WishlistCreateSerializer,
+    apply_wishlist_overlay, product_list_rows, serialize_product_rows
 )
-from .filters import ProductFilter
+from .filters import ProductFilter, ProductSearchFilter, RankAwareOrderingFilter
+from .pagination import CatalogPagination, KeysetPagination
+from .search import get_search_backend
+from .similarity import get_similarity_backend
+from .suggest import SUGGEST_MAX_LIMIT, get_suggestion_index
+
+def split_param_values(request, name):
+    """Values of a repeatable, comma separated query parameter, de-duplicated in order."""
+    values = (value.strip() for param in request.query_params.getlist(name) for value in param.split(','))
+    return list(dict.fromkeys(value for value in values if value))
+
+
+def bulk_product_tags(request, kwargs, data):
+    tags = ['products']
+    if data is not None:
+        for item in data['results']:
+            tags.append(f"product:{item['id']}")
+            if isinstance(item.get('category'), dict):
+                tags.append(f"category:{item['category']['id']}")
+    return tags
+
+
+def product_detail_tags(request, kwargs, data):
+    product_id = kwargs.get('pk') or request.data.get('id')
+    tags = [f'product:{product_id}']
+    if data is not None:
+        # The embedded category carries its product count
+        tags.append(f"category:{data['category']['id']}")
+    return tags
+
+
+class BulkLookup:
+    """Products requested by ?ids= and ?skus=, answered in the requested order."""
+
+    def __init__(self, ids, skus):
+        self.ids = ids
+        self.skus = skus
+        self.valid_ids = {}
+        for value in ids:
+            try:
+                self.valid_ids[value] = str(uuid.UUID(value))
+            except ValueError:
+                pass
+
+    @property
+    def condition(self):
+        return Q(pk__in=self.valid_ids.values()) | Q(sku__in=self.skus)
+
+    def order(self, by_id, by_sku):
+        """(found items in request order without repeats, missing ids and skus) from id and SKU maps."""
+        ordered, seen = [], set()
+        missing = {'ids': [], 'skus': []}
+        requested = [(by_id.get(self.valid_ids.get(value)), 'ids', value) for value in self.ids]
+        requested += [(by_sku.get(value), 'skus', value) for value in self.skus]
+        for item, kind, value in requested:
+            if item is None:
+                missing[kind].append(value)
+            elif id(item) not in seen:
+                seen.add(id(item))
+                ordered.append(item)
+        return ordered, missing
+
+
+# Per-category orderings accepted by ProductViewSet.categories (?sort=)
+CATEGORY_PREVIEW_ORDERINGS = {
+    'newest': ['-created_at', 'id'],
+    'rating': ['-stats__rating', '-stats__review_count', 'id'],
+    'price': ['price', 'id'],
+}
+
+class FastProductListMixin:
+    """Lists products through serialize_product_rows instead of ProductListSerializer instances."""
+
+    def list(self, request, *args, **kwargs):
+        rows = product_list_rows(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_product_rows(page, context))
+        return Response(serialize_product_rows(rows, context))
+
 
 class CategoryListView(generics.ListAPIView):
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = None
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+    @cached_catalog_response(tags=lambda request, kwargs, data: ['categories'])
+    def list(self, request, *args, **kwargs):
+        """Active categories as a tree, with own and subtree active product counts per node"""
+        return Response(serialize_category_tree(get_category_tree(), request))
+
+class ProductViewSet(FastProductListMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, RankAwareOrderingFilter]
     filterset_class = ProductFilter
+    pagination_class = CatalogPagination
     search_fields = ['name', 'description', 'category__name']
-    ordering_fields = ['price', 'rating', 'created_at']
+    ordering_fields = ['price', 'rating', 'created_at', 'discount']
+    ordering_aliases = {'discount': 'discount_percentage', 'rating': 'stats__rating'}
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Product.objects.filter(is_active=True).select_related('category').prefetch_related('images')
+        queryset = Product.objects.filter(is_active=True).select_related('category', 'stats')
+        if self.action == 'retrieve':
+            # Listings read the denormalized Product.primary_image instead
+            queryset = queryset.prefetch_related('images')
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if any(str(field).lstrip('-').startswith('stats__') for field in queryset.query.order_by):
+            # Every product has a stats row; requiring it turns the LEFT JOIN into an inner
+            # one, which the planner can drive from productstats_rating_idx instead of sorting
+            queryset = queryset.filter(stats__isnull=False)
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ProductDetailSerializer
         return ProductListSerializer
+
+    @cached_catalog_response(tags=lambda request, kwargs, data: ['products'])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_catalog_response(tags=product_detail_tags)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured products"""
-        featured_products = self.get_queryset().filter(is_featured=True)[:8]
-        serializer = self.get_serializer(featured_products, many=True)
-        return Response(serializer.data)
+        featured_products = product_list_rows(self.get_queryset().filter(is_featured=True))[:8]
+        return Response(serialize_product_rows(featured_products, self.get_serializer_context()))
     
+    @action(detail=False, methods=['get'])
+    @cached_catalog_response(tags=bulk_product_tags)
+    def bulk(self, request):
+        """Get many products by id and/or SKU in the requested order"""
+        lookup, error = self._bulk_lookup(request)
+        if error:
+            return error
+        view = request.query_params.get('view', 'list')
+        if view not in ('list', 'detail'):
+            return Response({'error': 'view must be list or detail'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = Product.objects.filter(is_active=True).filter(lookup.condition).select_related('category', 'stats')
+        serializer_class = ProductListSerializer
+        if view == 'detail':
+            serializer_class = ProductDetailSerializer
+            queryset = queryset.prefetch_related(*ProductDetailSerializer.prefetch_lookups())
+
+        products = list(queryset)
+        ordered, missing = lookup.order({str(product.pk): product for product in products},
+                                        {product.sku: product for product in products})
+        serializer = serializer_class(ordered, many=True, context=self.get_serializer_context())
+        return Response({'results': serializer.data, 'missing': missing})
+
+    @action(detail=False, methods=['get'])
+    @cached_catalog_response(tags=bulk_product_tags)
+    def availability(self, request):
+        """Color x size x material stock and price matrices of many products by id and/or SKU"""
+        lookup, error = self._bulk_lookup(request)
+        if error:
+            return error
+        # One grouped query over the products and their active variants
+        matrices = availability_matrices(Product.objects.filter(is_active=True).filter(lookup.condition))
+        ordered, missing = lookup.order({entry['id']: entry for entry in matrices.values()},
+                                        {entry['sku']: entry for entry in matrices.values()})
+        return Response({'results': ordered, 'missing': missing})
+
+    def _bulk_lookup(self, request):
+        ids = split_param_values(request, 'ids')
+        skus = split_param_values(request, 'skus')
+        if not ids and not skus:
+            return None, Response({'error': 'ids or skus is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) + len(skus) > settings.PRODUCT_BULK_MAX_ITEMS:
+            return None, Response(
+                {'error': f'At most {settings.PRODUCT_BULK_MAX_ITEMS} ids and skus per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return BulkLookup(ids, skus), None
+
+    @action(detail=True, methods=['get'])
+    @cached_catalog_response(
+        tags=lambda request, kwargs, data: [f"product:{kwargs['pk']}", 'products', 'recommendations']
+    )
+    def bought_together(self, request, pk=None):
+        """Products most often bought in the same orders, from the precomputed co-purchase table"""
+        try:
+            uuid.UUID(str(pk))
+        except ValueError:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(int(request.query_params.get('limit', 8)), settings.CO_PURCHASE_TOP_K)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        # One join over the (product, rank) index of the stored top-k neighbours
+        neighbors = self.get_queryset().filter(co_purchased_with__product_id=pk).order_by('co_purchased_with__rank')
+        rows = product_list_rows(neighbors)[:max(limit, 0)]
+        return Response(serialize_product_rows(rows, self.get_serializer_context()))
+
+    @action(detail=True, methods=['get'])
+    @cached_catalog_response(
+        tags=lambda request, kwargs, data: [f"product:{kwargs['pk']}", 'products', 'similar']
+    )
+    def similar(self, request, pk=None):
+        """Products closest to this one by embeddings of name, description, category and color"""
+        try:
+            uuid.UUID(str(pk))
+        except ValueError:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = int(request.query_params.get('limit', settings.PRODUCT_SIMILAR_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.PRODUCT_SIMILAR_MAX_LIMIT))
+        neighbors = get_similarity_backend().similar(self.get_queryset(), pk, limit)
+        rows = product_list_rows(neighbors)[:limit]
+        return Response(serialize_product_rows(rows, self.get_serializer_context()))
+
     @action(detail=False, methods=['get'])
     def categories(self, request):
-        """Get products grouped by category"""
-        categories = Category.objects.filter(is_active=True).prefetch_related('products')
-        data = []
-        
-        for category in categories:
-            products = category.products.filter(is_active=True)[:4]
-            data.append({
-                'category': CategorySerializer(category).data,
-                'products': ProductListSerializer(products, many=True, context={'request': request}).data
-            })
-        
+        """Get the top products of every active category in one windowed query"""
+        sort = request.query_params.get('sort', 'newest')
+        if sort not in CATEGORY_PREVIEW_ORDERINGS:
+            return Response(
+                {'error': f"sort must be one of: {', '.join(CATEGORY_PREVIEW_ORDERINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', settings.CATEGORY_PREVIEW_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.CATEGORY_PREVIEW_MAX_LIMIT))
+
+        cache_key = 'products:categories:{}:{}:{}:{}'.format(
+            get_catalog_version(), request.build_absolute_uri('/'), sort, limit
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = self._build_category_previews(request, sort, limit)
+            cache.set(cache_key, data, settings.CATALOG_CACHE_TIMEOUT)
+
+        apply_wishlist_overlay([product for group in data for product in group['products']], request)
         return Response(data)
+
+    def _build_category_previews(self, request, sort, limit):
+        categories = list(Category.objects.filter(is_active=True))
+        products = (
+            Product.objects.filter(is_active=True, category__is_active=True)
+            .select_related('category', 'stats')
+            .annotate(category_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('category_id')],
+                order_by=CATEGORY_PREVIEW_ORDERINGS[sort],
+            ))
+            .filter(category_rank__lte=limit)
+            .order_by('category_id', 'category_rank')
+        )
+        # Serialized without user state so the payload can be shared through the cache
+        serialized = ProductListSerializer(
+            products, many=True, context={'request': request, 'shared_payload': True}
+        ).data
+
+        by_category = {}
+        for product, item in zip(products, serialized):
+            by_category.setdefault(product.category_id, []).append(item)
+
+        return [
+            {
+                'category': category_data,
+                'products': by_category.get(category.pk, []),
+            }
+            for category, category_data in zip(categories, CategorySerializer(categories, many=True).data)
+        ]
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def toggle_wishlist(self, request, pk=None):
@@ -76,9 +327,11 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         product = self.get_object()
         
         if request.method == 'GET':
-            reviews = ProductReview.objects.filter(product=product)
-            serializer = ProductReviewSerializer(reviews, many=True)
-            return Response(serializer.data)
+            # Product detail embeds only the newest reviews; this pages through all of them
+            reviews = ProductReview.objects.filter(product=product).select_related('user').order_by('-created_at')
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(reviews, request, view=self)
+            return paginator.get_paginated_response(ProductReviewSerializer(page, many=True).data)
         
         elif request.method == 'POST':
             # Check if user already reviewed this product
@@ -94,16 +347,9 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             )
             
             if serializer.is_valid():
-                review = serializer.save()
-                
-                # Update product rating
-                avg_rating = ProductReview.objects.filter(product=product).aggregate(
-                    avg_rating=Avg('rating')
-                )['avg_rating']
-                
-                product.rating = round(avg_rating, 2) if avg_rating else 0
-                product.review_count = ProductReview.objects.filter(product=product).count()
-                product.save()
+                # The product's rating aggregates are adjusted by signals in the same transaction
+                with transaction.atomic():
+                    serializer.save()
                 
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             
@@ -111,9 +357,14 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
 class WishlistViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = CatalogPagination
     
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user).select_related('product')
+        return (
+            Wishlist.objects.filter(user=self.request.user)
+            .select_related('product__category', 'product__stats')
+            .order_by('-created_at', '-id')
+        )
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -138,47 +389,109 @@ class WishlistViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
-class SearchView(generics.ListAPIView):
+class SearchView(FastProductListMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
     filterset_class = ProductFilter
     search_fields = ['name', 'description', 'category__name']
     
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
+        query = self.request.query_params.get('q', '').strip()
         if query:
-            return Product.objects.filter(
-                Q(name__icontains=query) | 
-                Q(description__icontains=query) |
-                Q(category__name__icontains=query),
-                is_active=True
-            ).distinct()
+            queryset = Product.objects.filter(is_active=True).select_related('category')
+            return get_search_backend().search(queryset, query)
         return Product.objects.none()
 
 
+class ProductExportView(APIView):
+    """Staff download of every product matching the listing filters, with its variants, as CSV or JSONL"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        file_format, compress = export_options(request.query_params)
+        filterset = ProductFilter(request.query_params, queryset=Product.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return export_response(
+            product_export_rows(filterset.qs), PRODUCT_EXPORT_COLUMNS, file_format,
+            f'products-{timezone.now():%Y%m%d-%H%M%S}', compress,
+        )
+
+
+class FacetsView(APIView):
+    """Facet counts for the product listing under the same filter parameters"""
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        params = sorted(
+            (key, value)
+            for key in [*ProductFilter.base_filters, 'search']
+            for value in request.query_params.getlist(key)
+        )
+        cache_key = 'products:facets:{}:{}'.format(
+            get_catalog_version(), hashlib.md5(urlencode(params).encode()).hexdigest()
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = self._compute(request)
+            cache.set(cache_key, data, settings.CATALOG_CACHE_TIMEOUT)
+        return Response(data)
+
+    def _compute(self, request):
+        queryset = Product.objects.filter(is_active=True)
+        filterset = ProductFilter(request.query_params, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        # Non-facet filters narrow the rows in SQL; facet filters are applied per facet
+        base_params = request.query_params.copy()
+        for key in FACET_PARAMS:
+            base_params.pop(key, None)
+        queryset = ProductFilter(base_params, queryset=queryset, request=request).qs
+        query = request.query_params.get('search', '').strip()
+        if query:
+            queryset = get_search_backend().search(queryset, query)
+        return compute_facets(queryset, filterset.form.cleaned_data)
+
+
+class SuggestView(APIView):
+    """Autocomplete over active product names, SKUs and category names"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 8))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+
+        return Response({
+            'query': query,
+            'suggestions': get_suggestion_index().suggest(query, limit),
+        })
+
+
 class FeaturedProductsAPIView(APIView):
     permission_classes = [AllowAny]  # Allow non-auth users to access
 
+    @cached_catalog_response(tags=lambda request, kwargs, data: ['featured'])
     def get(self, request):
-        featured_products = Product.objects.filter(is_featured=True, is_active=True)
-        serializer = ProductListSerializer(
-            featured_products, 
-            many=True, 
-            context={'request': request}
-        )
-        return Response(serializer.data)
+        featured_products = product_list_rows(Product.objects.filter(is_featured=True, is_active=True))
+        return Response(serialize_product_rows(featured_products, {'request': request}))
 
 class FetchOneProductAPIView(APIView):
     permission_classes = [AllowAny]
 
+    @cached_catalog_response(tags=product_detail_tags, key_extra=lambda request: request.data.get('id'))
     def post(self, request):
         product_id = request.data.get('id')
         if not product_id:
             return Response({"detail": "Product ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            product = Product.objects.get(id=product_id, is_active=True)
+            product = Product.objects.select_related('category', 'stats').get(id=product_id, is_active=True)
         except Product.DoesNotExist:
             return Response({"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
 
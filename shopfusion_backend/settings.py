@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 from decouple import config
 
@@ -16,6 +17,7 @@ DJANGO_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -104,6 +106,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized copies written next to uploaded images (apps.core.images): name -> width in pixels
+IMAGE_DERIVATIVE_SIZES = {'thumbnail': 160, 'card': 480, 'zoom': 1600}
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+IMAGE_DERIVATIVE_QUALITY = 80
+# Off when derivatives are only produced by the backfill_image_derivatives job
+IMAGE_DERIVATIVES_ON_UPLOAD = config('IMAGE_DERIVATIVES_ON_UPLOAD', default=True, cast=bool)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.User'
@@ -122,10 +131,17 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Rows serialized and written per chunk by apps.core.renderers.streaming_list_response
+STREAMING_CHUNK_SIZE = 2000
+
 # ✅ CORS
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -155,4 +171,61 @@ EMAIL_HOST_USER = 'jnanaranjan27@gmail.com'
 EMAIL_HOST_PASSWORD = 'zbuv ogxf xylw sdzb'
 
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+
+# Catalog versions, cache tags and cached responses must be shared by every
+# worker, so a per-process backend (LocMemCache) only suits single-process setups
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': config('CACHE_LOCATION', default=REDIS_URL),
+    }
+}
+
+# Catalog
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+CATEGORY_PREVIEW_LIMIT = 4
+CATEGORY_PREVIEW_MAX_LIMIT = 20
+# Newest reviews embedded in product detail; older ones via /products/{id}/reviews/
+PRODUCT_DETAIL_REVIEW_LIMIT = 5
+# Upper bound on ids + skus per /products/bulk/ request
+PRODUCT_BULK_MAX_ITEMS = 250
+# Cached catalog responses (apps.products.http_cache): entries stay valid until a tagged write
+HTTP_CACHE_TIMEOUT = config('HTTP_CACHE_TIMEOUT', default=3600, cast=int)
+HTTP_CACHE_MAX_AGE = config('HTTP_CACHE_MAX_AGE', default=60, cast=int)
+# Upper bounds of the price buckets reported by /api/products/facets/
+PRODUCT_FACET_PRICE_EDGES = [500, 1000, 2500, 5000, 10000, 25000]
+# Page-number listings report the planner's row estimate instead of COUNT(*) above this size
+PAGINATION_ESTIMATE_THRESHOLD = config('PAGINATION_ESTIMATE_THRESHOLD', default=50000, cast=int)
+
+# "Bought together" recommendations (apps.products.recommendations)
+CO_PURCHASE_TOP_K = 20
+# Pairs bought together in fewer orders are treated as noise
+CO_PURCHASE_MIN_ORDERS = 2
+# Only the first products of very large orders are paired
+CO_PURCHASE_MAX_BASKET = 50
+# Orders younger than this are left to the next incremental run, as they may still be committing
+CO_PURCHASE_SETTLE_TIME = timedelta(minutes=5)
+# Co-occurrence counts kept between runs; not under MEDIA_ROOT, sales data must not be served
+CO_PURCHASE_STATE_FILE = config('CO_PURCHASE_STATE_FILE', default=os.path.join(BASE_DIR, 'var', 'co_purchase.npz'))
+
+# Content-based "similar products" (apps.products.similarity)
+# Any class with ``name``, ``dimensions`` and ``embed(documents)``; the default is local and deterministic
+PRODUCT_EMBEDDING_PROVIDER = config('PRODUCT_EMBEDDING_PROVIDER', default='apps.products.similarity.HashingEmbedder')
+# Width of ProductEmbedding.embedding: changing it needs a migration and a full re-embed
+PRODUCT_EMBEDDING_DIMENSIONS = 256
+PRODUCT_SIMILARITY_BACKEND = config(
+    'PRODUCT_SIMILARITY_BACKEND', default='apps.products.similarity.PgvectorSimilarityBackend'
+)
+PRODUCT_SIMILAR_LIMIT = 8
+PRODUCT_SIMILAR_MAX_LIMIT = 20
+# Re-embed products as they are saved; otherwise only the embed_products command does
+PRODUCT_EMBEDDINGS_ON_SAVE = config('PRODUCT_EMBEDDINGS_ON_SAVE', default=True, cast=bool)
+
+# Product search
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='apps.products.search.PostgresSearchBackend')
+PRODUCT_SEARCH_CONFIG = 'english'
+# Only used by apps.products.search.InMemorySearchBackend
+PRODUCT_SEARCH_INDEX_MIN_SIMILARITY = 0.45
+PRODUCT_SEARCH_INDEX_MAX_CANDIDATES = 400
+PRODUCT_SEARCH_INDEX_MAX_RESULTS = 200
 GEMINI_API_KEY = ''
@@ -4,3 +4,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopfusion_backend.settings')
 
 application = get_wsgi_application()
+
+# Build in-process catalog indexes once per worker, before the first request
+from apps.products.search_index import warm_search_index  # noqa: E402
+from apps.products.suggest import warm_suggestion_index  # noqa: E402
+
+warm_search_index()
+warm_suggestion_index()